@@ -1,11 +1,7 @@
-import asyncio
-import sys
 from os import environ
 
-from discord import Intents
-
-from bot import Harmony
-from config import TOKEN
+from cluster import launch_clusters, run_cluster
+from config import CLUSTER_COUNT, SHARD_COUNT
 
 environ["JISHAKU_NO_UNDERSCORE"] = "True"
 environ["JISHAKU_FORCE_PAGINATOR"] = "True"
@@ -22,30 +18,11 @@ initial_extensions = [
     "cogs.logging",
 ]
 
-intents = Intents.default()
-intents.message_content = True
-bot = Harmony(intents=intents, initial_extensions=initial_extensions)
-
-
-async def run() -> None:
-    print("Starting bot")  # noqa: T201
-    await bot.start(TOKEN)
-
 
 if __name__ == "__main__":
-    if sys.platform == "win32":
-        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-
-    try:
-        loop.run_until_complete(run())
-
-    except KeyboardInterrupt:
-        if hasattr(bot, "log"):
-            bot.log.critical("KeyboardInterrupt: Closing")
+    if CLUSTER_COUNT > 1:
+        launch_clusters(initial_extensions)
 
-    except Exception:
-        asyncio.run(bot.close())
-        raise
+    else:
+        # A single process owns every shard
+        run_cluster(initial_extensions, shard_count=SHARD_COUNT)
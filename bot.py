@@ -1,29 +1,59 @@
 from __future__ import annotations
 
+import asyncio
+import importlib
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import TYPE_CHECKING, Any, Optional
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, Optional
 
 import discord
 from aiohttp import ClientSession
-from asyncache import cachedmethod
 from asyncpg import Pool, Record, create_pool
 from discord.ext import commands
 from discord.ext.commands.core import (
     _CaseInsensitiveDict,
 )
-
-from config import DEFAULT_PREFIX, OWNER_IDS, POSTGRES_CONNECTION_URI
-from utils import Context
+from discord.ext.commands.view import StringView
+
+from config import (
+    DEFAULT_PREFIX,
+    LOOP_STALL_THRESHOLD,
+    METRICS_HOST,
+    METRICS_PORT,
+    OFFLOAD_WARM,
+    OWNER_IDS,
+    POOL_MAX_SIZE,
+    POOL_MIN_SIZE,
+    POOL_RESERVED,
+    POSTGRES_CONNECTION_URI,
+    TRACE_PATH,
+    TRACE_SLOW_THRESHOLD,
+)
+from utils import (
+    BaseCog,
+    Context,
+    Database,
+    LoopMonitor,
+    MetricsServer,
+    OffloadService,
+    PrefixEngine,
+    Tracer,
+    apply_migrations,
+    current_lane,
+    load_migrations,
+)
 
 if TYPE_CHECKING:
     from cogs.developer.blacklist import BlacklistItem, GuildBlacklistItem
+    from utils import MessageHandler
 
 
 __all__ = ("Harmony",)
 
 
-class Harmony(commands.Bot):
+class Harmony(commands.AutoShardedBot):
     """Bot class for Harmony"""
 
     session: ClientSession
@@ -32,12 +62,22 @@ class Harmony(commands.Bot):
     if TYPE_CHECKING:
         pool: Pool[Record]
 
+    db: Database
+
     user: discord.User
 
     blacklist: dict[int, BlacklistItem]
     guild_blacklist: dict[int, GuildBlacklistItem]
 
-    def __init__(self, intents: discord.Intents, initial_extensions: list[str], *args: Any, **kwargs: Any) -> None:
+    def __init__(
+        self,
+        intents: discord.Intents,
+        initial_extensions: list[str],
+        *args: Any,
+        cluster_id: int = 0,
+        cluster_count: int = 1,
+        **kwargs: Any,
+    ) -> None:
         super().__init__(
             *args,
             **kwargs,
@@ -51,59 +91,225 @@ class Harmony(commands.Bot):
         self._BotBase__cogs = _CaseInsensitiveDict()  # Hacky way to allow lowercase cog arguments in help command
 
         self.initial_extensions = initial_extensions
+        self.cluster_id = cluster_id
+        self.cluster_count = cluster_count
         self.started_at = datetime.now()
 
-        self.prefix_cache: dict[int, list[str]] = {}
+        # Startup profile, phase or extension name -> seconds
+        self.boot_started = time.perf_counter()
+        self.startup_phases: dict[str, float] = {}
+        self.extension_timings: dict[str, tuple[float, float]] = {}  # (import, setup)
 
-    def _key(self, message: discord.Message) -> int:
-        if message.guild is None:
-            return 0
-        return message.guild.id
+        self.prefixes = PrefixEngine(DEFAULT_PREFIX)
+        self.offload = OffloadService()
+        self.metrics = MetricsServer(self)
+        self.loop_monitor = LoopMonitor(threshold=LOOP_STALL_THRESHOLD)
+        self.tracer = Tracer(Path(TRACE_PATH) if TRACE_PATH else None, slow_threshold=TRACE_SLOW_THRESHOLD)
+        self.message_handlers: list[MessageHandler] = []
+        self.background_tasks: set[asyncio.Task[Any]] = set()  # Referenced so they can't be collected
 
-    @cachedmethod(lambda self: self.prefix_cache, key=_key)
-    async def get_prefix(self, message: discord.Message) -> list[str]:
-        if message.guild is None:
-            return commands.when_mentioned_or(DEFAULT_PREFIX)(self, message)
+    async def get_prefix(self, message: discord.Message) -> tuple[str, ...]:  # type: ignore
+        # A tuple is accepted by `get_context`, and passes through `tuple()` without being copied
+        return self.prefixes.get(message.guild and message.guild.id)
 
-        prefixes = await self.pool.fetchval("SELECT prefixes FROM prefixes WHERE guild_id = $1", message.guild.id)
-        if prefixes is not None:
-            return commands.when_mentioned_or(*prefixes)(self, message)
+    def owns_guild(self, guild_id: int) -> bool:
+        """Returns `True` if the guild belongs to one of this cluster's shards."""
 
-        self.log.warning("Prefix not found for guild with ID %s, using default prefix", message.guild.id)
-        return commands.when_mentioned_or(DEFAULT_PREFIX)(self, message)
+        if self.shard_ids is None or self.shard_count is None:
+            return True
+
+        return (guild_id >> 22) % self.shard_count in self.shard_ids
 
     async def get_context(self, origin: discord.Message | discord.Interaction, *, cls: Any = Context) -> Context:
-        return await super().get_context(origin, cls=cls)
+        ctx = await super().get_context(origin, cls=cls)
+
+        # Hybrid commands are run by the task that builds their context, right after this
+        if isinstance(origin, discord.Interaction) and ctx.command is not None:
+            self.begin_command(ctx, interaction=True)
+
+        return ctx
+
+    async def invoke(self, ctx: Context, /) -> None:  # type: ignore
+        if ctx.command is not None:
+            self.begin_command(ctx)
+
+        await super().invoke(ctx)
+
+    def begin_command(self, ctx: Context, **attributes: Any) -> None:
+        """Marks the current task as running a command, tracing it and moving its queries to the interactive lane."""
+
+        ctx.trace = self.tracer.start_trace(ctx.command.qualified_name, start=ctx.started_at, **attributes)
+        current_lane.set("interactive")
+
+    def record_phase(self, name: str, start: float) -> float:
+        """Records a startup phase which began at `start`, returning the current time."""
+
+        now = time.perf_counter()
+        self.startup_phases[name] = now - start
+        return now
+
+    def import_extensions(self) -> None:
+        """Imports every extension's module, and its dependencies, one after another.
+
+        This runs in a single thread; importing the extensions in parallel threads could deadlock on the module locks of
+        their shared imports. Import errors are raised again, and logged, when the extension is loaded.
+        """
+
+        for name in self.initial_extensions:
+            start = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except Exception:
+                pass
+
+            self.extension_timings[name] = (time.perf_counter() - start, 0.0)
+
+    async def setup_extension(self, name: str) -> None:
+        start = time.perf_counter()
+        try:
+            await self.load_extension(name)
+            self.log.info("Loading extension: %s", name)
+
+        except Exception as exc:
+            self.log.error("Failed to load extension: %s", name, exc_info=exc)
+
+        import_time, _ = self.extension_timings.get(name, (0.0, 0.0))
+        self.extension_timings[name] = (import_time, time.perf_counter() - start)
 
     async def setup_hook(self) -> None:
         discord.utils.setup_logging(level=logging.INFO)
         logging.getLogger("discord.gateway").setLevel(logging.WARNING)
-
-        pool: Optional[Pool[Record]] = await create_pool(POSTGRES_CONNECTION_URI, timeout=30)
+        self.log = logging.getLogger("Harmony")
+        self.loop_monitor.start()
+        self.tracer.start()
+
+        start = self.record_phase("login", self.boot_started)
+
+        # Extensions are imported in the background while the database is set up
+        imports = asyncio.create_task(asyncio.to_thread(self.import_extensions))
+
+        pool: Optional[Pool[Record]] = await create_pool(
+            POSTGRES_CONNECTION_URI,
+            timeout=30,
+            min_size=POOL_MIN_SIZE,
+            max_size=POOL_MAX_SIZE,
+            max_inactive_connection_lifetime=300,
+            statement_cache_size=256,  # Every named query stays prepared on every connection
+            init=self.tracer.setup_connection,
+        )
         if not pool or pool and pool._closed:
             raise RuntimeError("Pool is closed")
 
         self.pool = pool
+        self.db = Database(pool, reserved=POOL_RESERVED)
+        start = self.record_phase("pool", start)
+
+        await apply_migrations(pool, load_migrations())
+        start = self.record_phase("migrations", start)
 
-        # Run schema
-        with open("schema.sql", "r", encoding="utf-8") as f:
-            schema = f.read()
-            await pool.execute(schema)
+        self.prefixes.set_user(self.user.id)
+        await self.prefixes.load(pool)
+        start = self.record_phase("prefixes", start)
 
         headers = {"User-Agent": "Harmony Discord Bot (https://github.com/itswilliboy/Harmony)"}
-        self.session = ClientSession(headers=headers)
-        self.log = logging.getLogger("Harmony")
+        trace_configs = [self.metrics.trace_config(), self.tracer.trace_config()]
+        self.session = ClientSession(headers=headers, trace_configs=trace_configs)
 
-        for ext in self.initial_extensions:
-            try:
-                await self.load_extension(ext)
-                self.log.info("Loading extension: %s", ext)
+        if METRICS_PORT:
+            # Every cluster listens on its own port, counting up from METRICS_PORT
+            await self.metrics.start(METRICS_HOST, METRICS_PORT + self.cluster_id)
+
+        self.offload.start()  # The workers themselves are started on the first task, unless warmed up here
+        if OFFLOAD_WARM:
+            task = self.loop.create_task(self.offload.warm())
+            self.background_tasks.add(task)
+            task.add_done_callback(self.background_tasks.discard)
+
+        await imports
+        start = self.record_phase("imports", start)
+
+        await asyncio.gather(*(self.setup_extension(ext) for ext in self.initial_extensions))
+
+        # Extensions finish loading in any order, keep the cogs in the order of the extensions (e.g. for the help command)
+        order = {ext: i for i, ext in enumerate(self.initial_extensions)}
+        self._BotBase__cogs = _CaseInsensitiveDict(
+            sorted(self.cogs.items(), key=lambda item: self._extension_index(order, item[1]))
+        )
+
+        self.record_phase("extensions", start)
+
+    async def _run_event(
+        self, coro: Callable[..., Coroutine[Any, Any, Any]], event_name: str, *args: Any, **kwargs: Any
+    ) -> None:
+        start = time.perf_counter()
+        try:
+            await super()._run_event(coro, event_name, *args, **kwargs)
+        finally:
+            self.metrics.observe_event(event_name, time.perf_counter() - start)
+
+    @staticmethod
+    def _extension_index(order: dict[str, int], cog: commands.Cog) -> int:
+        module = type(cog).__module__
+        for ext, index in order.items():
+            if module == ext or module.startswith(f"{ext}."):
+                return index
+
+        return len(order)
+
+    async def add_cog(self, cog: commands.Cog, /, *, override: bool = False, **kwargs: Any) -> None:
+        await super().add_cog(cog, override=override, **kwargs)
+
+        if isinstance(cog, BaseCog):
+            self.message_handlers.extend(cog.get_message_handlers())
 
-            except Exception as exc:
-                self.log.error("Failed to load extension: %s", ext, exc_info=exc)
+    async def remove_cog(self, name: str, /, **kwargs: Any) -> Optional[commands.Cog]:
+        cog = await super().remove_cog(name, **kwargs)
+
+        if cog is not None:
+            self.message_handlers = [h for h in self.message_handlers if getattr(h.callback, "__self__", None) is not cog]
+
+        return cog
+
+    async def on_message(self, message: discord.Message, /) -> None:
+        """The message pipeline; builds one context per message and hands it to every registered handler."""
+
+        if message.webhook_id is not None:
+            return
+
+        is_bot = message.author.bot
+        if is_bot:
+            # Bots can't invoke commands, so there's no need to resolve prefixes or commands
+            ctx = Context(prefix=None, view=StringView(message.content), bot=self, message=message)
+        else:
+            ctx = await self.get_context(message)
+
+        blacklisted = ctx.is_blacklisted()
+        for handler in self.message_handlers:
+            if (is_bot and not handler.bots) or (blacklisted and not handler.blacklisted):
+                continue
+
+            self._schedule_event(handler.callback, "message", ctx)
+
+        if not is_bot:
+            await self.invoke(ctx)
 
     async def on_ready(self) -> None:
-        self.log.info("Logged in as %s on discord.py version %s", self.user, discord.__version__)
+        if "ready" not in self.startup_phases:
+            self.startup_phases["ready"] = time.perf_counter() - self.boot_started - sum(self.startup_phases.values())
+            self.log.info(
+                "Ready in %.2fs (%s)",
+                time.perf_counter() - self.boot_started,
+                ", ".join(f"{name}: {seconds:.2f}s" for name, seconds in self.startup_phases.items()),
+            )
+
+        self.log.info(
+            "Logged in as %s on discord.py version %s (cluster %s/%s, shards %s)",
+            self.user,
+            discord.__version__,
+            self.cluster_id + 1,
+            self.cluster_count,
+            ", ".join(map(str, sorted(self.shards))),
+        )
 
     async def on_message_edit(self, before: discord.Message, after: discord.Message):
         if before.content != after.content and before.created_at + timedelta(minutes=5) > discord.utils.utcnow():
@@ -115,10 +321,16 @@ class Harmony(commands.Bot):
         return await super().is_owner(user)
 
     async def close(self) -> None:
+        # Extensions are unloaded first so that they can write any buffered data before the pool is closed
+        await super().close()
+
         if hasattr(self, "pool"):
             await self.pool.close()
 
         if hasattr(self, "session"):
             await self.session.close()
 
-        await super().close()
+        self.offload.close()
+        await self.metrics.close()
+        self.loop_monitor.stop()
+        await self.tracer.close()
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import signal
+import sys
+import time
+from typing import TYPE_CHECKING, Optional
+
+import discord
+from discord import Intents
+
+from bot import Harmony
+from config import CLUSTER_COUNT, SHARD_COUNT, TOKEN
+
+if TYPE_CHECKING:
+    from multiprocessing.process import BaseProcess
+
+__all__ = ("launch_clusters", "run_cluster")
+
+
+log = logging.getLogger("Harmony.launcher")
+
+
+def create_bot(
+    initial_extensions: list[str],
+    cluster_id: int = 0,
+    shard_ids: Optional[list[int]] = None,
+    shard_count: Optional[int] = None,
+) -> Harmony:
+    intents = Intents.default()
+    intents.message_content = True
+
+    return Harmony(
+        intents=intents,
+        initial_extensions=initial_extensions,
+        cluster_id=cluster_id,
+        cluster_count=CLUSTER_COUNT,
+        shard_ids=shard_ids,
+        shard_count=shard_count,
+    )
+
+
+async def run(bot: Harmony) -> None:
+    print(f"Starting bot (cluster {bot.cluster_id + 1}/{bot.cluster_count})")  # noqa: T201
+    await bot.start(TOKEN)
+
+
+def run_cluster(
+    initial_extensions: list[str],
+    cluster_id: int = 0,
+    shard_ids: Optional[list[int]] = None,
+    shard_count: Optional[int] = None,
+    delay: float = 0,
+) -> None:
+    """Runs a single cluster, owning `shard_ids`, until it's closed."""
+
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    # Clusters identify one after another, to stay within the gateway's identify concurrency
+    time.sleep(delay)
+
+    bot = create_bot(initial_extensions, cluster_id, shard_ids, shard_count)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    closing: list[asyncio.Task[None]] = []
+
+    def close(signum: int) -> None:
+        # Closing the bot unloads the cogs, which write out the statistics they've buffered
+        if not closing:
+            log.critical("%s: Closing cluster %s", signal.Signals(signum).name, bot.cluster_id)
+            closing.append(loop.create_task(bot.close()))
+
+    if sys.platform != "win32":
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, close, signum)
+
+    try:
+        loop.run_until_complete(run(bot))
+
+    except KeyboardInterrupt:
+        if hasattr(bot, "log"):
+            bot.log.critical("KeyboardInterrupt: Closing")
+        loop.run_until_complete(bot.close())
+
+    except Exception:
+        asyncio.run(bot.close())
+        raise
+
+    else:
+        if closing:
+            loop.run_until_complete(closing[0])  # The bot stops running before it has finished closing
+
+
+async def fetch_gateway_info() -> tuple[int, int]:
+    """Returns the recommended shard count and the identify concurrency."""
+
+    http = discord.http.HTTPClient(asyncio.get_running_loop())
+    try:
+        await http.static_login(TOKEN)
+        shards, _, limits = await http.get_bot_gateway()
+        return shards, limits["max_concurrency"]
+
+    finally:
+        await http.close()
+
+
+def launch_clusters(initial_extensions: list[str]) -> None:
+    """Splits the shards between `CLUSTER_COUNT` processes and restarts any cluster that exits unexpectedly."""
+
+    discord.utils.setup_logging(level=logging.INFO)
+
+    recommended, concurrency = asyncio.run(fetch_gateway_info())
+    shard_count = max(SHARD_COUNT or recommended, CLUSTER_COUNT)
+
+    clusters = [list(range(shard_count))[i::CLUSTER_COUNT] for i in range(CLUSTER_COUNT)]
+    ctx = multiprocessing.get_context("spawn")
+
+    def start(cluster_id: int, delay: float) -> BaseProcess:
+        process = ctx.Process(
+            target=run_cluster,
+            args=(initial_extensions, cluster_id, clusters[cluster_id], shard_count, delay),
+            name=f"harmony-cluster-{cluster_id}",
+        )
+        process.start()
+        log.info("Started cluster %s with shards %s (PID %s)", cluster_id, clusters[cluster_id], process.pid)
+        return process
+
+    def terminate(*_: object) -> None:
+        raise KeyboardInterrupt  # Handled below, along with SIGINT
+
+    signal.signal(signal.SIGTERM, terminate)
+
+    processes: dict[int, BaseProcess] = {}
+    delay = 0.0
+    for cluster_id, shard_ids in enumerate(clusters):
+        processes[cluster_id] = start(cluster_id, delay)
+        delay += 5.0 * -(-len(shard_ids) // concurrency)
+
+    try:
+        while processes:
+            time.sleep(5)
+
+            for cluster_id, process in list(processes.items()):
+                if process.is_alive():
+                    continue
+
+                if process.exitcode == 0:
+                    log.info("Cluster %s exited", cluster_id)
+                    del processes[cluster_id]
+
+                else:
+                    log.warning("Cluster %s exited with code %s, restarting", cluster_id, process.exitcode)
+                    processes[cluster_id] = start(cluster_id, 5.0)
+
+    except KeyboardInterrupt:
+        log.critical("KeyboardInterrupt: Closing clusters")
+
+        # The clusters close themselves on SIGTERM, which they may not have received if only this process was signalled
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+
+        for process in processes.values():
+            process.join(timeout=30)
@@ -4,29 +4,34 @@ import asyncio
 import datetime
 import random
 from collections import ChainMap
-from typing import TYPE_CHECKING, Annotated, Any, Literal, Optional, cast
+from typing import TYPE_CHECKING, Annotated, Any, ClassVar, Literal, Optional, cast
 
 import discord
 from discord.app_commands import allowed_contexts, allowed_installs, describe
 from discord.ext import commands
 
 from config import DEFAULT_PREFIX
-from utils import BaseCog, Context, GenericError, Page, Paginator, PrimaryEmbed, SuccessEmbed
+from utils import BaseCog, Context, GenericError, Page, Paginator, PrimaryEmbed, SuccessEmbed, message_handler
 from utils.utils import try_get_ani_id
 
-from .anime import Media, MinifiedMedia
+from .anime import Media
 from .client import AniListClient
+from .inline import find_inline_queries
 from .media_list import MediaList
 from .oauth import User
-from .types import FavouriteType, MediaListEntry, MediaListStatus, MediaT, MediaType, Regex
+from .types import FavouriteType, MediaListEntry, MediaListStatus, MediaT, MediaType
 from .utils import get_activity_message, get_favourites, get_title
 from .views import Delete, EmbedRelationView, LoginView, SearchView
 
 if TYPE_CHECKING:
     from bot import Harmony
+    from cogs.infrastructure.ipc import IPC
 
 
 class AniUser(commands.UserConverter):
+    # Whether to fetch the user's recent activity along with them, for the commands which show it
+    with_activity: ClassVar[bool] = False
+
     async def convert(self, ctx: Context, argument: str) -> Optional[User]:
         arg: Optional[int] = None
         try:
@@ -41,7 +46,10 @@ class AniUser(commands.UserConverter):
         if u := cog.user_cache.get(arg or argument):
             return u
 
-        user = await cog.client.oauth.get_user(arg or argument, use_cache=False)
+        if self.with_activity and arg is not None:
+            user = await cog.client.fetch_profile(arg)
+        else:
+            user = await cog.client.oauth.get_user(arg or argument, use_cache=False)
 
         if not user:
             raise commands.BadArgument("Couldn't find a user with that name")
@@ -50,10 +58,18 @@ class AniUser(commands.UserConverter):
         return user
 
 
+class AniProfile(AniUser):
+    with_activity = True
+
+
 async def _default(ctx: Context) -> Optional[User]:
     return await AniUser().convert(ctx, str(ctx.author.id))
 
 
+async def _default_profile(ctx: Context) -> Optional[User]:
+    return await AniProfile().convert(ctx, str(ctx.author.id))
+
+
 class AnilistRandomFlags(commands.FlagConverter):
     type: MediaType = MediaType.ANIME
     status: MediaListStatus = MediaListStatus.PLANNING
@@ -61,6 +77,8 @@ class AnilistRandomFlags(commands.FlagConverter):
 
 aniuser = commands.parameter(default=_default, converter=AniUser, displayed_name="AniList user")
 AniUserConv = Annotated[User, AniUser]
+aniprofile = commands.parameter(default=_default_profile, converter=AniProfile, displayed_name="AniList user")
+AniProfileConv = Annotated[User, AniProfile]
 anilist_random_flag_converter = commands.parameter(converter=AnilistRandomFlags)
 
 
@@ -76,62 +94,46 @@ class AniList(BaseCog, name="Anime"):
         self.client = AniListClient(bot)
         self.user_cache = self.client.user_cache
 
+        self.optouts: set[int] = set()
+        self.guild_optouts: set[int] = set()
+
+    async def cog_load(self) -> None:
+        self.bot.metrics.add_cache("anilist", self.client.cache)
+        self.bot.metrics.add_cache("anilist_inflight", self.client.inflight)  # Hits are requests saved by coalescing
+
+        records = await self.bot.pool.fetch("SELECT user_id FROM inline_search_optout")
+        self.optouts = {record["user_id"] for record in records}
+
+        records = await self.bot.pool.fetch("SELECT guild_id FROM inline_search_guild_optout")
+        self.guild_optouts = {record["guild_id"] for record in records}
+
     async def cog_check(self, ctx: Context) -> bool:
         if ctx.command.name != "login":
             await ctx.typing()
         return True
 
-    # TODO: Implement guild-wide optout
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        ctx = await self.bot.get_context(message)
-        if ctx.is_blacklisted():
-            return
+    @message_handler()
+    async def inline_search_listener(self, ctx: Context):
+        message = ctx.message
 
-        if message.author.bot:
+        if message.author.id in self.optouts:
             return
 
-        if await self.bot.pool.fetchval(
-            "SELECT EXISTS(SELECT 1 FROM inline_search_optout WHERE user_id = $1)", message.author.id
-        ):
+        if message.guild is not None and message.guild.id in self.guild_optouts:
             return
 
-        content = message.content
-
-        for match in reversed(list(Regex.INLINE_CB_REGEX.finditer(content))):
-            start, end = match.span("CB")
-            content = content[:start] + content[end:]
-
-        content = Regex.CB_REGEX.sub(" ", content)
-        content = Regex.HL_REGEX.sub(" ", content)
-
-        anime = Regex.ANIME_REGEX.findall(content)
-        manga = Regex.MANGA_REGEX.findall(content)
-
+        anime, manga = find_inline_queries(message.content)
         if not anime and not manga:
             return
 
-        found: list[MinifiedMedia] = []
-
         async with message.channel.typing():
             embed = PrimaryEmbed()
 
-            # TODO: Do one big query instead of looping through and sending multiple requests
-            for name in anime:
-                media = await self.client.search_minified_media(name, type=MediaType.ANIME)
-                if media and media not in found:
-                    found.append(media)
-                    embed.add_field(
-                        name=f"**__{media.name}__** (**{media.mean_score}%**)", value=media.small_info, inline=False
-                    )
-
-            for name in manga:
-                media = await self.client.search_minified_media(name, type=MediaType.MANGA)
-                if media and media not in found:
-                    found.append(media)
-                    embed.add_field(
-                        name=f"**__{media.name}__** (**{media.mean_score}%**)", value=media.small_info, inline=False
-                    )
+            found = await self.client.search_minified_many(
+                [(name, MediaType.ANIME) for name in anime] + [(name, MediaType.MANGA) for name in manga]
+            )
+            for media in found:
+                embed.add_field(name=f"**__{media.name}__** (**{media.mean_score}%**)", value=media.small_info, inline=False)
 
         if not embed.fields:
             try:
@@ -239,14 +241,46 @@ class AniList(BaseCog, name="Anime"):
     @commands.hybrid_command(hidden=True)
     async def optout(self, ctx: Context):
         """Opts you out (or back in) of inline search."""
-        # TODO: fix query
-        if await ctx.pool.fetchval("SELECT EXISTS(SELECT 1 FROM inline_search_optout WHERE user_id = $1)", ctx.author.id):
+
+        ipc = cast("IPC", self.bot.cogs["infrastructure"])
+
+        if ctx.author.id in self.optouts:
             await ctx.pool.execute("DELETE FROM inline_search_optout WHERE user_id = $1", ctx.author.id)
+            self.optouts.discard(ctx.author.id)
+            await ipc.broadcast("inline_search_optout", {"user_id": ctx.author.id, "optout": False})
             await ctx.send("Opted back into inline search.")
         else:
-            await ctx.pool.execute("INSERT INTO inline_search_optout (user_id) VALUES ($1)", ctx.author.id)
+            await ctx.pool.execute(
+                "INSERT INTO inline_search_optout (user_id) VALUES ($1) ON CONFLICT DO NOTHING", ctx.author.id
+            )
+            self.optouts.add(ctx.author.id)
+            await ipc.broadcast("inline_search_optout", {"user_id": ctx.author.id, "optout": True})
             await ctx.send("Opted out of inline search.")
 
+    @commands.Cog.listener()
+    async def on_ipc_inline_search_optout(self, data: dict[str, Any]):
+        if data["optout"]:
+            self.optouts.add(data["user_id"])
+        else:
+            self.optouts.discard(data["user_id"])
+
+    @commands.hybrid_command(hidden=True, aliases=["guildoptout"])
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    async def serveroptout(self, ctx: Context):
+        """Opts the whole server out (or back in) of inline search."""
+
+        if ctx.guild.id in self.guild_optouts:
+            await ctx.pool.execute("DELETE FROM inline_search_guild_optout WHERE guild_id = $1", ctx.guild.id)
+            self.guild_optouts.discard(ctx.guild.id)
+            await ctx.send("Opted the server back into inline search.")
+        else:
+            await ctx.pool.execute(
+                "INSERT INTO inline_search_guild_optout (guild_id) VALUES ($1) ON CONFLICT DO NOTHING", ctx.guild.id
+            )
+            self.guild_optouts.add(ctx.guild.id)
+            await ctx.send("Opted the server out of inline search.")
+
     @commands.hybrid_command(aliases=["a"])
     @allowed_installs(guilds=True, users=True)
     @allowed_contexts(guilds=True, dms=True, private_channels=True)
@@ -278,7 +312,7 @@ class AniList(BaseCog, name="Anime"):
 
     @describe(user="AniList username")
     @anilist.command(aliases=["p"])
-    async def profile(self, ctx: Context, user: AniUserConv = aniuser):
+    async def profile(self, ctx: Context, user: AniProfileConv = aniprofile):
         """Shows information about someone's profile on AniList."""
         embed = PrimaryEmbed(title=user.name, url=user.url)
         embed.set_thumbnail(url=user.avatar_url)
@@ -446,7 +480,7 @@ class AniList(BaseCog, name="Anime"):
         await Paginator(pages, ctx.author).start(ctx)
 
     @anilist.command(aliases=["recent", "r", "a"])
-    async def activity(self, ctx: Context, user: AniUserConv = aniuser):
+    async def activity(self, ctx: Context, user: AniProfileConv = aniprofile):
         """Shows somebody's recent activity on AniList."""
         activities = await self.client.fetch_user_activity(user.id)
 
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Hashable, NamedTuple, Optional, TypeVar
+
+from cachetools import LRUCache
+
+from .scheduler import Priority, request_priority
+
+if TYPE_CHECKING:
+    from bot import Harmony
+
+__all__ = ("ResponseCache", "CachePolicy", "SingleFlight", "normalise")
+
+T = TypeVar("T")
+
+
+def normalise(search: str) -> str:
+    """Normalises a search so that e.g. `Frieren` and ` frieren ` share a cache entry."""
+
+    return " ".join(search.casefold().split())
+
+
+class CachePolicy(NamedTuple):
+    """How long an entry is served as is (`fresh`), and then served while being refreshed in the background (`stale`)."""
+
+    fresh: float
+    stale: float = 0.0
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    fresh_until: float
+    expires_at: float
+
+
+class ResponseCache:
+    """An LRU cache of AniList responses, with stale-while-revalidate.
+
+    An entry younger than its policy's `fresh` time is returned directly. Past that, and for another `stale` seconds, it
+    is still returned immediately, but is refetched in the background; anything older is refetched before returning.
+    """
+
+    def __init__(self, bot: Harmony, *, maxsize: int = 2048) -> None:
+        self.bot = bot
+        self.entries: LRUCache[Hashable, CacheEntry] = LRUCache(maxsize=maxsize)
+        self.refreshing: set[Hashable] = set()
+        self.tasks: set[asyncio.Task[None]] = set()  # Refreshes, referenced so they can't be collected
+
+        self.hits = 0
+        self.stale_hits = 0  # Included in `hits`
+        self.misses = 0
+
+    def set(self, key: Hashable, value: Any, policy: CachePolicy) -> None:
+        now = time.monotonic()
+        self.entries[key] = CacheEntry(value, now + policy.fresh, now + policy.fresh + policy.stale)
+
+    def get_fresh(self, key: Hashable) -> Optional[Any]:
+        """Returns an entry's value if it's fresh; stale entries are left for the caller to refetch."""
+
+        entry = self.entries.get(key)
+        if entry is not None and time.monotonic() < entry.fresh_until:
+            self.hits += 1
+            return entry.value
+
+        self.misses += 1
+        return None
+
+    def invalidate(self, key: Hashable) -> None:
+        self.entries.pop(key, None)
+
+    async def get(self, key: Hashable, policy: CachePolicy, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Returns the cached value of `key`, calling `fetch` if there is none. `None` results aren't cached."""
+
+        now = time.monotonic()
+        entry = self.entries.get(key)
+
+        if entry is not None and now < entry.fresh_until:
+            self.hits += 1
+            return entry.value
+
+        if entry is not None and now < entry.expires_at:
+            self.hits += 1
+            self.stale_hits += 1
+            if key not in self.refreshing:
+                self.refreshing.add(key)
+                task = self.bot.loop.create_task(self.refresh(key, policy, fetch))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+            return entry.value
+
+        self.misses += 1
+        value = await fetch()
+        if value is not None:
+            self.set(key, value, policy)
+
+        return value
+
+    async def refresh(self, key: Hashable, policy: CachePolicy, fetch: Callable[[], Awaitable[Any]]) -> None:
+        request_priority.set(Priority.BACKGROUND)  # This runs in its own task, so only the refresh is affected
+
+        try:
+            value = await fetch()
+            if value is not None:
+                self.set(key, value, policy)
+
+        except Exception as exc:
+            # The stale value keeps being served until it expires
+            self.bot.log.warning("Failed to refresh AniList cache entry %r", key, exc_info=exc)
+
+        finally:
+            self.refreshing.discard(key)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls, so that only the first one runs and the others await its result.
+
+    `hits` counts the calls which were saved, and `misses` the ones which ran.
+    """
+
+    def __init__(self) -> None:
+        self.inflight: dict[Hashable, asyncio.Task[Any]] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        if (task := self.inflight.get(key)) is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.inflight[key] = task = asyncio.create_task(func())  # type: ignore
+            task.add_done_callback(lambda t: self._done(key, t))
+
+        # Shielded so that a cancelled caller doesn't cancel the call for everyone else
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task[Any]) -> None:
+        if self.inflight.get(key) is task:
+            del self.inflight[key]
+
+        if not task.cancelled():
+            task.exception()  # Retrieved here, in case every caller was cancelled
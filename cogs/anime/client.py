@@ -1,124 +1,162 @@
 from __future__ import annotations
 
-from json import JSONDecodeError
-from typing import TYPE_CHECKING, Any, ClassVar, NamedTuple, Optional, Self
+from json import JSONDecodeError, dumps
+from typing import TYPE_CHECKING, Any, ClassVar, Iterable, NamedTuple, Optional, Self
 
 from aiohttp import ContentTypeError
 from cachetools import TTLCache
 
-from utils import decrypt
+from utils import decrypt, query
 
 from .anime import Media, MinifiedMedia
-from .oauth import AccessToken, ApiExecption, OAuth, User
+from .cache import CachePolicy, ResponseCache, SingleFlight, normalise
+from .loader import MediaLoader
+from .oauth import USER_FRAGMENT, AccessToken, ApiExecption, OAuth, User
+from .scheduler import Priority, RateLimited, RateLimitScheduler, request_priority
 from .types import ActivityType, ListActivity, MediaListCollection, MediaListStatus, MediaType, SearchMedia
 
 if TYPE_CHECKING:
     from bot import Harmony
 
 
+GET_TOKEN_QUERY = query("anilist.get_token", "SELECT * FROM anilist_tokens_new WHERE user_id = $1")
+
+
 class InvalidToken(Exception): ...
 
 
 class NotFound(Exception): ...
 
 
-MINIFIED_SEARCH_QUERY = """
-    query ($search: String, $type: MediaType) {
-        Media(search: $search, type: $type, sort: POPULARITY_DESC) {
-            id
-            isAdult
-            idMal
-            type
-            episodes
-            status
-            chapters
-            volumes
-            genres
-            title {
-                romaji
-                english
-                native
-            }
-            season
-            seasonYear
-            meanScore
-            format
-            coverImage {
-                extraLarge
-                color
-            }
+MINIFIED_MEDIA_FRAGMENT = """
+    fragment minifiedMedia on Media {
+        id
+        isAdult
+        idMal
+        type
+        episodes
+        status
+        chapters
+        volumes
+        genres
+        title {
+            romaji
+            english
+            native
+        }
+        season
+        seasonYear
+        meanScore
+        format
+        coverImage {
+            extraLarge
+            color
         }
     }
 """
 
-MEDIA_QUERY = """
-    query ($search: String, $id: Int, $type: MediaType) {
-        Media(search: $search, id: $id, type: $type, sort: POPULARITY_DESC) {
-            id
-            isAdult
-            idMal
-            type
-            description(asHtml: false)
-            episodes
-            hashtag
-            status
-            bannerImage
-            duration
-            chapters
-            volumes
-            genres
-            title {
-                romaji
-                english
-                native
-            }
-            startDate {
-                year
-                month
-                day
-            }
-            endDate {
-                year
-                month
-                day
-            }
-            season
-            seasonYear
-            meanScore
-            coverImage {
-                extraLarge
-                large
-                medium
-                color
-            }
-            studios(isMain: true) {
-                nodes {
-                    name
-                    siteUrl
-                }
+
+def build_minified_search_many_query(count: int) -> str:
+    """Builds a document with `count` aliased minified searches, aliased as `m0`, `m1`, ..."""
+
+    variables = ", ".join(f"$s{i}: String, $t{i}: MediaType" for i in range(count))
+    fields = "\n".join(
+        f"        m{i}: Media(search: $s{i}, type: $t{i}, sort: POPULARITY_DESC) {{ ...minifiedMedia }}"
+        for i in range(count)
+    )
+    return f"query ({variables}) {{\n{fields}\n}}\n{MINIFIED_MEDIA_FRAGMENT}"
+
+
+MEDIA_FRAGMENT = """
+    fragment fullMedia on Media {
+        id
+        isAdult
+        idMal
+        type
+        description(asHtml: false)
+        episodes
+        hashtag
+        status
+        bannerImage
+        duration
+        chapters
+        volumes
+        genres
+        title {
+            romaji
+            english
+            native
+        }
+        startDate {
+            year
+            month
+            day
+        }
+        endDate {
+            year
+            month
+            day
+        }
+        season
+        seasonYear
+        meanScore
+        coverImage {
+            extraLarge
+            large
+            medium
+            color
+        }
+        studios(isMain: true) {
+            nodes {
+                name
+                siteUrl
             }
-            relations {
-                edges {
-                    node {
+        }
+        relations {
+            edges {
+                node {
                     id
-                        format
-                        status
-                        seasonYear
-                        startDate {
-                            year
-                        }
-                        title {
-                            romaji
-                        }
-                        ...listEntry
+                    format
+                    status
+                    seasonYear
+                    startDate {
+                        year
+                    }
+                    title {
+                        romaji
                     }
-                    relationType(version: 2)
                 }
+                relationType(version: 2)
             }
-            ...listEntry
         }
     }
+"""
 
+MEDIA_QUERY = (
+    """
+    query ($search: String, $id: Int, $type: MediaType) {
+        Media(search: $search, id: $id, type: $type, sort: POPULARITY_DESC) {
+            ...fullMedia
+        }
+    }
+"""
+    + MEDIA_FRAGMENT
+)
+
+MEDIA_BATCH_QUERY = (
+    """
+    query ($ids: [Int]) {
+        Page(perPage: 50) {
+            media(id_in: $ids) {
+                ...fullMedia
+            }
+        }
+    }
+"""
+    + MEDIA_FRAGMENT
+)
+
+LIST_ENTRY_FRAGMENT = """
     fragment listEntry on Media {
         mediaListEntry {
             score(format: POINT_100)
@@ -325,76 +363,143 @@ COMPARISON_LIST_QUERY = """
     {fragment}
 """
 
-FOLLOWING_QUERY = """
+FOLLOWING_FRAGMENT = """
+    fragment followingEntry on MediaList {
+        status
+        score(format: POINT_100)
+        progress
+        repeat
+        media {
+            episodes
+            chapters
+        }
+        user {
+            siteUrl
+            name
+            id
+            mediaListOptions {
+                scoreFormat
+            }
+        }
+    }
+"""
+
+FOLLOWING_QUERY = (
+    """
     query ($id: Int, $page: Int, $perPage: Int) {
         Page(page: $page, perPage: $perPage) {
             mediaList(mediaId: $id, isFollowing: true, sort: UPDATED_TIME_DESC) {
-                status
-                score(format: POINT_100)
-                progress
-                repeat
-                media {
-                    episodes
-                    chapters
-                }
-                user {
-                    siteUrl
-                    name
-                    id
-                    mediaListOptions {
-                        scoreFormat
+                ...followingEntry
+            }
+        }
+    }
+"""
+    + FOLLOWING_FRAGMENT
+)
+
+# The fields of a media that depend on who is viewing it; anonymous results can be shared, these can't. Fetched in one
+# request: the user's list entries, the statuses of the users they follow (under `Page`, like `FOLLOWING_QUERY`) and
+# the user themselves
+PERSONALISED_MEDIA_QUERY = (
+    """
+    query ($id: Int, $perPage: Int) {
+        Media(id: $id) {
+            id
+            relations {
+                edges {
+                    node {
+                        id
+                        ...listEntry
                     }
                 }
             }
+            ...listEntry
+        }
+        Page(perPage: $perPage) {
+            mediaList(mediaId: $id, isFollowing: true, sort: UPDATED_TIME_DESC) {
+                ...followingEntry
+            }
+        }
+        Viewer {
+            ...userFragment
+        }
+    }
+"""
+    + LIST_ENTRY_FRAGMENT
+    + FOLLOWING_FRAGMENT
+    + USER_FRAGMENT
+)
+
+LIST_ACTIVITY_FRAGMENT = """
+    fragment listActivity on ListActivity {
+        id
+        type
+        replyCount
+        status
+        progress
+        isLocked
+        isSubscribed
+        isLiked
+        isPinned
+        likeCount
+        createdAt
+        siteUrl
+        user {
+            id
+            name
+            siteUrl
+            avatar {
+                large
+            }
+        }
+        media {
+            id
+            type
+            status(version: 2)
+            isAdult
+            bannerImage
+            siteUrl
+            title {
+                english
+                romaji
+            }
+            coverImage {
+                large
+            }
         }
     }
 """
 
-ACTIVITY_QUERY = """
+ACTIVITY_QUERY = (
+    """
     query ($id: Int, $type: ActivityType) {
         Page(perPage: 25) {
             activities(userId: $id, type: $type, sort: [PINNED, ID_DESC]) {
-                ... on ListActivity {
-                    id
-                    type
-                    replyCount
-                    status
-                    progress
-                    isLocked
-                    isSubscribed
-                    isLiked
-                    isPinned
-                    likeCount
-                    createdAt
-                    siteUrl
-                    user {
-                        id
-                        name
-                        siteUrl
-                        avatar {
-                            large
-                        }
-                    }
-                    media {
-                        id
-                        type
-                        status(version: 2)
-                        isAdult
-                        bannerImage
-                        siteUrl
-                        title {
-                            english
-                            romaji
-                        }
-                        coverImage {
-                            large
-                        }
-                    }
-                }
+                ...listActivity
             }
         }
     }
 """
+    + LIST_ACTIVITY_FRAGMENT
+)
+
+# A user along with their recent activity, for the commands showing both
+PROFILE_QUERY = (
+    """
+    query ($id: Int, $type: ActivityType) {
+        User(id: $id) {
+            ...userFragment
+        }
+        Page(perPage: 25) {
+            activities(userId: $id, type: $type, sort: [PINNED, ID_DESC]) {
+                ...listActivity
+            }
+        }
+    }
+"""
+    + USER_FRAGMENT
+    + LIST_ACTIVITY_FRAGMENT
+)
 
 
 class MediaReturn[T](NamedTuple):
@@ -406,57 +511,172 @@ class MediaReturn[T](NamedTuple):
         return cls(None, None)
 
 
+def with_viewer_fields(data: dict[str, Any], viewer: dict[str, Any]) -> dict[str, Any]:
+    """Returns a copy of a media's public data with the viewer's list entries filled in."""
+
+    entries = {edge["node"]["id"]: edge["node"].get("mediaListEntry") for edge in viewer["relations"]["edges"]}
+    edges = [
+        {**edge, "node": {**edge["node"], "mediaListEntry": entries.get(edge["node"]["id"])}}
+        for edge in data["relations"]["edges"]
+    ]
+
+    return {**data, "mediaListEntry": viewer.get("mediaListEntry"), "relations": {**data["relations"], "edges": edges}}
+
+
 class AniListClient:
     URL: ClassVar[str] = "https://graphql.anilist.co"
 
+    CACHE_POLICIES: ClassVar[dict[str, CachePolicy]] = {
+        "media": CachePolicy(fresh=600, stale=3600),
+        "search": CachePolicy(fresh=300, stale=1800),
+        "minified": CachePolicy(fresh=1800, stale=6 * 3600),
+        "viewer": CachePolicy(fresh=30),  # List entries change, and aren't refreshed in the background
+        "activity": CachePolicy(fresh=30),
+    }
+
     def __init__(self, bot: Harmony) -> None:
         self.bot = bot
         self.oauth = OAuth(bot.session, self)
         self.user_cache: TTLCache[str | int, User] = TTLCache(maxsize=100, ttl=600)
         self.random_store: TTLCache[int, str] = TTLCache(maxsize=100, ttl=300)
+        self.cache = ResponseCache(bot)
+        self.scheduler = RateLimitScheduler()
+        self.inflight = SingleFlight()
+        self.loader = MediaLoader(self)
 
-    async def search_media(self, search: str, *, type: MediaType, user_id: Optional[int] = None) -> MediaReturn[Media]:
-        """Searches and returns a media via a search query."""
+    async def _send(
+        self,
+        query: str,
+        variables: dict[str, Any],
+        *,
+        headers: Optional[dict[str, str]] = None,
+        priority: Optional[Priority] = None,
+    ) -> tuple[int, Any]:
+        """Sends a query, returning the status and the decoded response, if any.
 
-        variables = {"search": search, "type": type}
-        headers = await self.get_headers(user_id) if user_id else {}
+        While an identical query (same variables, sent as the same user, at the same priority) is in flight, its response
+        is shared instead of sending another request. The response must therefore not be modified. The priority is part
+        of the key since a request can be shed depending on it.
+        """
 
-        async with self.bot.session.post(
-            self.URL,
-            json={"query": MEDIA_QUERY, "variables": variables},
-            headers=headers,
-        ) as resp:
-            if resp.status == 400:
-                raise InvalidToken("The token has either expired or been revoked.")
+        priority = request_priority.get() if priority is None else priority
 
-            try:
-                json = await resp.json()
+        authorization = headers.get("Authorization") if headers else None
+        key = (query, dumps(variables, sort_keys=True, default=str), authorization, priority)
+        return await self.inflight.run(key, lambda: self._send_now(query, variables, headers, priority))
+
+    async def _send_now(
+        self, query: str, variables: dict[str, Any], headers: Optional[dict[str, str]], priority: Priority
+    ) -> tuple[int, Any]:
+        """Sends a query through the rate limit scheduler.
 
-            except (ContentTypeError, JSONDecodeError) as exc:
-                raise ApiExecption() from exc
+        Rate limited requests are retried after AniList's `Retry-After`, unless they're inline or background requests.
+        """
 
+        for _ in range(3):
+            await self.scheduler.acquire(priority)
+
+            status: Optional[int] = None
+            response_headers = None
+            json: Any = None
             try:
-                data_ = json["data"]
-                data = data_["Media"]
-            except (KeyError, TypeError):
-                return MediaReturn[Any].none()
+                async with self.bot.session.post(
+                    self.URL,
+                    json={"query": query, "variables": variables},
+                    headers=headers or {},
+                ) as resp:
+                    status, response_headers = resp.status, resp.headers
 
-            if data is None:
-                return MediaReturn[Any].none()
+                    try:
+                        json = await resp.json()
+                    except (ContentTypeError, JSONDecodeError):
+                        pass
+
+            finally:
+                self.scheduler.release(status, response_headers)
+
+            if status != 429:
+                return status, json
+
+            if priority >= Priority.INLINE:
+                break
+
+        raise RateLimited()
 
-        following_status = {}
-        if user_id:
-            following_status = await self.fetch_following_status(
-                data["id"],
-                user_id,
-                headers=headers,
-            )
+    async def _request(self, query: str, variables: dict[str, Any], **kwargs: Any) -> Any:
+        """Sends a query and returns the decoded response."""
+
+        status, json = await self._send(query, variables, **kwargs)
+        if status == 400 and kwargs.get("headers"):
+            raise InvalidToken("The token has either expired or been revoked.")
+
+        if json is None:
+            raise ApiExecption()
+
+        return json
+
+    async def _request_media(self, query: str, variables: dict[str, Any], **kwargs: Any) -> Optional[dict[str, Any]]:
+        json = await self._request(query, variables, **kwargs)
+
+        try:
+            return json["data"]["Media"]
+        except (KeyError, TypeError):
+            return None
+
+    async def get_public_media(self, key: str | int, variables: dict[str, Any]) -> Optional[dict[str, Any]]:
+        """Returns the anonymous data of a media, shared between every user. Lookups by ID are batched."""
+
+        if "id" in variables:
+            fetch = lambda: self.loader.load(variables["id"])
+        else:
+            fetch = lambda: self._request_media(MEDIA_QUERY, variables)
+
+        return await self.cache.get(("media", key, variables.get("type")), self.CACHE_POLICIES["media"], fetch)
+
+    async def get_personal_media(
+        self, media_id: int, user_id: int, headers: dict[str, str], *, per_page: int = 15
+    ) -> Optional[dict[str, Any]]:
+        """Returns a user's list entries for a media, the statuses of the users they follow, and the user themselves."""
+
+        async def fetch() -> Optional[dict[str, Any]]:
+            json = await self._request(PERSONALISED_MEDIA_QUERY, {"id": media_id, "perPage": per_page}, headers=headers)
+            return json.get("data")
+
+        return await self.cache.get(("personal", user_id, media_id), self.CACHE_POLICIES["viewer"], fetch)
+
+    async def personalise_media(
+        self, data: dict[str, Any], user_id: Optional[int], headers: dict[str, str]
+    ) -> tuple[dict[str, Any], dict[str, Any], Optional[User]]:
+        """Fills a user's list entries into a media's public data, returning it with the following status and the user."""
+
+        if not user_id or not headers:
+            return data, {}, None
+
+        personal = await self.get_personal_media(data["id"], user_id, headers)
+        if personal is None:
+            return data, {}, None
+
+        if (viewer := personal.get("Media")) is not None:
+            data = with_viewer_fields(data, viewer)
 
         user: Optional[User] = None
-        if headers:
-            user = await self.oauth.get_current_user(headers["Authorization"].split()[1])
+        if (viewer_user := personal.get("Viewer")) is not None:
+            user = self.user_cache[viewer_user["id"]] = User.from_json(viewer_user)
+
+        # Parsed like the response of `FOLLOWING_QUERY`, which has the same `Page`
+        return data, {"data": {"Page": personal.get("Page") or {}}}, user
+
+    async def search_media(self, search: str, *, type: MediaType, user_id: Optional[int] = None) -> MediaReturn[Media]:
+        """Searches and returns a media via a search query."""
+
+        data = await self.get_public_media(normalise(search), {"search": search, "type": type})
+        if data is None:
+            return MediaReturn[Any].none()
+
+        headers = await self.get_headers(user_id) if user_id else {}
+        data, following_status, user = await self.personalise_media(data, user_id, headers)
 
-        media = Media.from_json(data, following_status or {}), user
+        media = Media.from_json(data, following_status), user
         return MediaReturn(*media)
 
     async def search_many(
@@ -464,23 +684,21 @@ class AniListClient:
     ) -> MediaReturn[list[SearchMedia]]:
         """Searches for media and returns the first 25 results."""
 
-        variables = {"search": search}
-        headers = await self.get_headers(user_id) if user_id else {}
+        async def fetch() -> Optional[list[SearchMedia]]:
+            json = await self._request(SEARCH_QUERY, {"search": search})
 
-        async with self.bot.session.post(
-            self.URL, json={"query": SEARCH_QUERY, "variables": variables}, headers=headers
-        ) as resp:
             try:
-                json = await resp.json()
-
-            except (ContentTypeError, JSONDecodeError) as exc:
-                raise ApiExecption() from exc
+                return json["data"]["Page"]["media"]
+            except (KeyError, TypeError):
+                return None
 
-            if not json:
-                return MediaReturn[Any].none()
+        media: Optional[list[SearchMedia]] = await self.cache.get(
+            ("search", normalise(search), None), self.CACHE_POLICIES["search"], fetch
+        )
+        if media is None:
+            return MediaReturn[Any].none()
 
-            data_ = json["data"]
-            media: list[SearchMedia] = data_["Page"]["media"]
+        headers = await self.get_headers(user_id) if user_id else {}
 
         user: Optional[User] = None
         if headers:
@@ -490,66 +708,63 @@ class AniListClient:
             return MediaReturn(media, user)
         return MediaReturn([m for m in media if not m["isAdult"]], user)
 
-    async def search_minified_media(self, search: str, *, type: MediaType) -> Optional[MinifiedMedia]:
-        """Searchs and returns a "minified" media via a search query."""
+    async def search_minified_many(
+        self, searches: Iterable[tuple[str, MediaType]], *, limit: int = 25
+    ) -> list[MinifiedMedia]:
+        """Searches and returns "minified" media for several `(search, type)` pairs in a single request.
 
-        variables = {"search": search, "type": type}
+        Results keep the order of `searches`; searches without a result, or resolving to an already found media, are skipped.
+        Fresh cached results are reused, and only the remaining searches are sent.
+        """
 
-        async with self.bot.session.post(
-            self.URL,
-            json={"query": MINIFIED_SEARCH_QUERY, "variables": variables},
-        ) as resp:
-            try:
-                json = await resp.json()
+        unique = list(dict.fromkeys((normalise(search), type) for search, type in searches if search.strip()))
+        unique = unique[:limit]
+        if not unique:
+            return []
 
-            except (ContentTypeError, JSONDecodeError):
-                return None  # Not sending error messages if it's a minified media
+        results = {key: self.cache.get_fresh(("minified", *key)) for key in unique}
+        missing = [key for key, data in results.items() if data is None]
 
-            if not json:
-                return None
+        if missing:
+            variables: dict[str, Any] = {}
+            for i, (search, type) in enumerate(missing):
+                variables[f"s{i}"] = search
+                variables[f"t{i}"] = type
 
             try:
-                data_ = json["data"]
-                data = data_["Media"]
-            except (KeyError, TypeError):
-                return None
-
+                query = build_minified_search_many_query(len(missing))
+                json = await self._request(query, variables, priority=Priority.INLINE)
+            except (ApiExecption, RateLimited):
+                json = None  # Not sending error messages if it's a minified media
+
+            data_ = json.get("data") if isinstance(json, dict) else None
+            for i, key in enumerate(missing):
+                if data_ and (data := data_.get(f"m{i}")) is not None:
+                    results[key] = data
+                    self.cache.set(("minified", *key), data, self.CACHE_POLICIES["minified"])
+
+        found: list[MinifiedMedia] = []
+        for data in results.values():
             if data is None:
-                return None
+                continue
 
-        return MinifiedMedia.from_json(data)
+            media = MinifiedMedia.from_json(data)
+            if media not in found:
+                found.append(media)
+
+        return found
 
     async def fetch_media(self, id: int, *, user_id: Optional[int] = None) -> Media:
         """Fetches and returns a media via an ID."""
 
-        variables = {"id": id}
-        headers = await self.get_headers(user_id) if user_id else {}
+        data = await self.get_public_media(id, {"id": id})
+        if data is None:
+            raise NotFound from None
 
-        async with self.bot.session.post(
-            self.URL,
-            json={"query": MEDIA_QUERY, "variables": variables},
-            headers=headers,
-        ) as resp:
-            json = await resp.json()
-
-            try:
-                data_ = json["data"]
-                data = data_["Media"]
-            except (KeyError, TypeError):
-                raise NotFound from None
-
-            if data is None:
-                raise NotFound from None
-
-        following_status = {}
-        if user_id:
-            following_status = await self.fetch_following_status(
-                id,
-                user_id,
-                headers=headers,
-            )
+        headers = await self.get_headers(user_id) if user_id else {}
+        data, following_status, _ = await self.personalise_media(data, user_id, headers)
 
-        return Media.from_json(data, following_status or {})
+        return Media.from_json(data, following_status)
 
     async def fetch_following_status(
         self,
@@ -568,22 +783,12 @@ class AniListClient:
         if not headers:
             return None
 
-        async with self.bot.session.post(
-            self.URL,
-            json={
-                "query": FOLLOWING_QUERY,
-                "variables": variables,
-            },
-            headers=headers,
-        ) as resp:
-            if resp.status == 200:
-                try:
-                    json = await resp.json()
+        status, json = await self._send(FOLLOWING_QUERY, variables, headers=headers)
+        if status == 200:
+            if json is None:
+                raise ApiExecption()
 
-                except (ContentTypeError, JSONDecodeError) as exc:
-                    raise ApiExecption() from exc
-
-                return json
+            return json
 
     async def fetch_media_collection(self, user: int | str, type: MediaType) -> MediaListCollection:
         """Fetches a user's anime- or manga list via their user ID or username."""
@@ -595,16 +800,11 @@ class AniListClient:
         else:
             variables["userName"] = user
 
-        async with self.bot.session.post(self.URL, json={"query": MEDIA_LIST_QUERY, "variables": variables}) as resp:
-            try:
-                json = await resp.json()
-
-            except (ContentTypeError, JSONDecodeError) as exc:
-                raise ApiExecption() from exc
+        json = await self._request(MEDIA_LIST_QUERY, variables)
 
-            data = json["data"]["MediaListCollection"]
-            collection: MediaListCollection = data
-            return collection
+        data = json["data"]["MediaListCollection"]
+        collection: MediaListCollection = data
+        return collection
 
     async def fetch_media_collections(
         self, *users: str | int, type: MediaType, status: MediaListStatus, user_id: Optional[int] = None
@@ -631,30 +831,36 @@ class AniListClient:
         if user_id is not None:
             headers = await self.get_headers(user_id)
 
-        async with self.bot.session.post(self.URL, json={"query": query, "variables": variables}, headers=headers) as resp:
-            if resp.status == 200:
-                try:
-                    json = await resp.json()
+        status, json = await self._send(query, variables, headers=headers)
+        if status == 200:
+            if json is None:
+                raise ApiExecption()
 
-                except (ContentTypeError, JSONDecodeError) as exc:
-                    raise ApiExecption() from exc
-
-                return json["data"]
-            return {}
+            return json["data"]
+        return {}
 
     async def fetch_user_activity(self, user_id: int, *, type: ActivityType = ActivityType.MEDIA_LIST) -> list[ListActivity]:
-        variables: dict[str, str | int] = {"type": type, "id": user_id}
-        async with self.bot.session.post(self.URL, json={"query": ACTIVITY_QUERY, "variables": variables}) as resp:
-            if resp.status == 200:
-                data = await resp.json()
-                activities: list[ListActivity] = data["data"]["Page"]["activities"]
-                return activities
+        async def fetch() -> Optional[list[ListActivity]]:
+            variables: dict[str, str | int] = {"type": type, "id": user_id}
+            status, data = await self._send(ACTIVITY_QUERY, variables)
+            if status == 200 and data is not None:
+                return data["data"]["Page"]["activities"]
 
-            return []
+        activities = await self.cache.get(("activity", user_id, type), self.CACHE_POLICIES["activity"], fetch)
+        return activities or []
+
+    async def fetch_profile(self, user_id: int, *, type: ActivityType = ActivityType.MEDIA_LIST) -> Optional[User]:
+        """Fetches a user by their AniList ID, along with their recent activity, which `fetch_user_activity` then returns."""
+
+        status, data = await self._send(PROFILE_QUERY, {"id": user_id, "type": type})
+        if status != 200 or data is None or data["data"]["User"] is None:
+            return None
+
+        self.cache.set(("activity", user_id, type), data["data"]["Page"]["activities"], self.CACHE_POLICIES["activity"])
+        return User.from_json(data["data"]["User"])
 
     async def get_token(self, user_id: int) -> Optional[AccessToken]:
-        query = "SELECT * FROM anilist_tokens_new WHERE user_id = $1"
-        resp = await self.bot.pool.fetchrow(query, user_id)
+        resp = await self.bot.db.fetchrow(GET_TOKEN_QUERY, user_id)
 
         if not resp:
             return None
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import re
+from typing import NamedTuple
+
+__all__ = ("InlineQueries", "find_inline_queries")
+
+
+# Every alternative stops at the next delimiter of its own kind (or the end of the line), so a failed match never
+# rescans text another attempt already covered, and the whole message is scanned once.
+TOKEN_REGEX = re.compile(
+    r"```[\s\S]*?```"  # Code block
+    r"|(`{1,2})[^`\n]+\1"  # Inline code
+    r"|\{\{(?P<anime>[^{}\n]*)\}\}"
+    r"|\[\[(?P<manga>[^\[\]\n]*)\]\]"
+    r"|\[[^\[\]\n]*\]\([^()\s]*\)"  # Hyperlink
+)
+
+
+class InlineQueries(NamedTuple):
+    anime: list[str]
+    manga: list[str]
+
+
+def find_inline_queries(content: str) -> InlineQueries:
+    """Returns the `{{anime}}` and `[[manga]]` queries in a message, in order.
+
+    Code blocks, inline code and hyperlinks are skipped, and queries can't span multiple lines.
+    """
+
+    queries = InlineQueries([], [])
+    if "{{" not in content and "[[" not in content:
+        return queries
+
+    for match in TOKEN_REGEX.finditer(content):
+        if (anime := match.group("anime")) is not None:
+            queries.anime.append(anime)
+
+        elif (manga := match.group("manga")) is not None:
+            queries.manga.append(manga)
+
+    return queries
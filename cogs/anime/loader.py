@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Optional
+
+from .scheduler import Priority, request_priority
+
+if TYPE_CHECKING:
+    from .client import AniListClient
+
+__all__ = ("MediaLoader",)
+
+MediaFuture = asyncio.Future[Optional[dict[str, Any]]]
+
+
+class Batch:
+    """IDs to be fetched together, sent at the highest priority of the callers waiting on them."""
+
+    __slots__ = ("futures", "priority")
+
+    def __init__(self) -> None:
+        self.futures: dict[int, MediaFuture] = {}
+        self.priority = Priority.BACKGROUND
+
+
+class MediaLoader:
+    """Batches media lookups by ID.
+
+    IDs requested within `delay` seconds of each other are fetched together with a single `Page(media(id_in: ...))`
+    query, of up to `max_batch` IDs, and each caller receives its own media's data. A caller only joins a batch which
+    was already sent if it was sent at the caller's priority or higher, so that e.g. a command isn't shed along with a
+    background refresh.
+    """
+
+    def __init__(self, client: AniListClient, *, delay: float = 0.005, max_batch: int = 50) -> None:
+        self.client = client
+        self.delay = delay
+        self.max_batch = max_batch
+
+        self.pending = Batch()  # Waiting to be sent
+        self.loading: dict[int, tuple[MediaFuture, Batch]] = {}  # Pending, or in a batch being fetched
+        self.handle: Optional[asyncio.TimerHandle] = None
+        self.tasks: set[asyncio.Task[None]] = set()  # Batches being fetched, referenced so they can't be collected
+
+        self.batches = 0
+        self.loaded = 0
+
+    async def load(self, id: int) -> Optional[dict[str, Any]]:
+        """Returns the public data of a media, or `None` if it doesn't exist."""
+
+        priority = request_priority.get()
+
+        loading = self.loading.get(id)
+        if loading is not None and (loading[1] is self.pending or loading[1].priority <= priority):
+            future, batch = loading
+        else:
+            batch = self.pending
+            future = batch.futures[id] = asyncio.get_running_loop().create_future()
+            self.loading[id] = (future, batch)
+            future.add_done_callback(lambda f: self._done(id, f))
+
+        if batch is self.pending:
+            batch.priority = min(batch.priority, priority)
+
+            if len(batch.futures) >= self.max_batch:
+                self.dispatch()
+            elif self.handle is None:
+                self.handle = asyncio.get_running_loop().call_later(self.delay, self.dispatch)
+
+        return await asyncio.shield(future)
+
+    def _done(self, id: int, future: MediaFuture) -> None:
+        if (loading := self.loading.get(id)) is not None and loading[0] is future:
+            del self.loading[id]
+
+        if not future.cancelled():
+            future.exception()  # Retrieved here, in case every caller was cancelled
+
+    def dispatch(self) -> None:
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+        batch, self.pending = self.pending, Batch()
+        if batch.futures:
+            task = asyncio.create_task(self.fetch(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def fetch(self, batch: Batch) -> None:
+        from .client import MEDIA_BATCH_QUERY
+
+        self.batches += 1
+        self.loaded += len(batch.futures)
+
+        try:
+            json = await self.client._request(MEDIA_BATCH_QUERY, {"ids": list(batch.futures)}, priority=batch.priority)
+
+        except Exception as exc:
+            for future in batch.futures.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        try:
+            media = {data["id"]: data for data in json["data"]["Page"]["media"]}
+        except (KeyError, TypeError):
+            media = {}  # As with a single media, a response without data means it wasn't found
+
+        for id, future in batch.futures.items():
+            if not future.done():
+                future.set_result(media.get(id))
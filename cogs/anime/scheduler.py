@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import Counter
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import TYPE_CHECKING, ClassVar, Optional
+
+from utils import GenericError
+
+if TYPE_CHECKING:
+    from multidict import CIMultiDictProxy
+
+__all__ = ("Priority", "RateLimited", "RateLimitScheduler", "request_priority")
+
+
+class Priority(IntEnum):
+    """The priority of an AniList request, lower runs first."""
+
+    INTERACTIVE = 0  # Commands
+    CALLBACK = 1  # Buttons and selects on existing messages
+    INLINE = 2  # Inline searches in messages
+    BACKGROUND = 3  # Cache refreshes
+
+
+# Requests are interactive unless the code sending them says otherwise
+request_priority: ContextVar[Priority] = ContextVar("request_priority", default=Priority.INTERACTIVE)
+
+
+class RateLimited(GenericError):
+    def __init__(self) -> None:
+        super().__init__("AniList is receiving too many requests right now, please try again in a minute.")
+
+
+class RateLimitScheduler:
+    """Keeps requests to AniList within its rate limit, running the most important ones first.
+
+    The remaining budget is estimated as a token bucket refilling `limit` requests every `window` seconds, and corrected
+    from the `X-RateLimit-Remaining` header of every response. Each priority only starts a request while more than its
+    reserve of the budget is left, so the lower tiers run out first. When they do, inline and background requests are
+    shed immediately, while commands and callbacks queue for up to `max_wait` seconds.
+    """
+
+    # The share of the budget each priority leaves for the ones above it
+    RESERVES: ClassVar[dict[Priority, float]] = {
+        Priority.INTERACTIVE: 0.0,
+        Priority.CALLBACK: 0.05,
+        Priority.INLINE: 0.25,
+        Priority.BACKGROUND: 0.5,
+    }
+
+    def __init__(self, *, limit: int = 90, window: float = 60.0, max_wait: float = 10.0) -> None:
+        self.limit = limit
+        self.window = window
+        self.max_wait = max_wait
+
+        self.remaining = float(limit)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0  # From a 429's Retry-After
+        self.in_flight = 0
+
+        self.waiters: list[tuple[Priority, int, asyncio.Future[None]]] = []
+        self.counter = itertools.count()
+        self.wake_handle: Optional[asyncio.TimerHandle] = None
+
+        self.shed: Counter[Priority] = Counter()
+        self.throttled = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.remaining = min(self.limit, self.remaining + (now - self.updated_at) * self.limit / self.window)
+        self.updated_at = now
+
+    def _can_start(self, priority: Priority) -> bool:
+        self._refill()
+        return time.monotonic() >= self.blocked_until and self.remaining - 1 >= self.limit * self.RESERVES[priority]
+
+    def _start(self) -> None:
+        self.remaining -= 1
+        self.in_flight += 1
+
+    async def acquire(self, priority: Priority) -> None:
+        """Waits until a request with the given priority can be sent."""
+
+        queued_ahead = any(waiter[0] <= priority for waiter in self.waiters)
+        if not queued_ahead and self._can_start(priority):
+            return self._start()
+
+        if priority >= Priority.INLINE:
+            self.shed[priority] += 1
+            raise RateLimited()
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.counter), future))
+        self._schedule_wake()
+
+        try:
+            await asyncio.wait_for(future, self.max_wait)
+
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                self.release(None, None)  # Granted as the wait timed out
+            self.shed[priority] += 1
+            raise RateLimited() from None
+
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(None, None)  # Granted, but never used
+            raise
+
+    def release(self, status: Optional[int], headers: Optional[CIMultiDictProxy[str]]) -> None:
+        """Updates the budget from a response, `status` and `headers` being `None` if the request failed."""
+
+        self.in_flight -= 1
+
+        if headers is not None and (remaining := headers.get("X-RateLimit-Remaining")) is not None:
+            self.remaining = max(int(remaining) - self.in_flight, 0)
+            self.updated_at = time.monotonic()
+
+        if status == 429:
+            self.throttled += 1
+            retry_after = float(headers.get("Retry-After", 60)) if headers is not None else 60.0
+            self.blocked_until = time.monotonic() + retry_after
+            self.remaining = 0
+
+        self._wake()
+
+    def _schedule_wake(self) -> None:
+        if self.wake_handle is not None or not self.waiters:
+            return
+
+        delay = max(self.blocked_until - time.monotonic(), self.window / self.limit)
+        self.wake_handle = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _wake(self) -> None:
+        if self.wake_handle is not None:
+            self.wake_handle.cancel()
+            self.wake_handle = None
+
+        while self.waiters:
+            priority, _, future = self.waiters[0]
+            if future.done():  # Timed out
+                heapq.heappop(self.waiters)
+                continue
+
+            if not self._can_start(priority):
+                break
+
+            heapq.heappop(self.waiters)
+            self._start()
+            future.set_result(None)
+
+        self._schedule_wake()
@@ -293,10 +293,5 @@ class ListActivityMessage(NamedTuple):
 
 
 class Regex:
-    ANIME_REGEX = re.compile(r"\{\{(.*?)\}\}")
-    MANGA_REGEX = re.compile(r"\[\[(.*?)\]\]")
-    INLINE_CB_REGEX = re.compile(r"(?P<CB>(`{1,2})[^`^\n]+?\2)(?:$|[^`])")
-    CB_REGEX = re.compile(r"```[\S\s]+?```")
-    HL_REGEX = re.compile(r"\[.*?\]\(.*?\)")
     TAG_REGEX = re.compile(r"</?\w+/?>")
     SOURCE_REGEX = re.compile(r"\(Source: .+\)")
@@ -8,6 +8,7 @@ from discord import ui
 
 from utils import BaseView
 
+from .scheduler import Priority, request_priority
 from .types import Edge, MediaRelation, SearchMedia
 
 if TYPE_CHECKING:
@@ -23,6 +24,7 @@ if TYPE_CHECKING:
 
 
 async def callback(cog: AniList, id: int, interaction: discord.Interaction, user: Optional[User] = None):
+    request_priority.set(Priority.CALLBACK)
     media = await cog.client.fetch_media(id, user_id=interaction.user.id)
     view = EmbedRelationView(cog, media, user, author=interaction.user)
 
@@ -344,6 +346,7 @@ class SearchSelect(ui.Select["SearchView"]):
         self.author = author
 
     async def callback(self, interaction: Interaction):
+        request_priority.set(Priority.CALLBACK)
         media = await self.cog.client.fetch_media(int(self.values[0]), user_id=self.author.id if self.author else None)
         assert media
 
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import datetime
-from typing import TYPE_CHECKING, Optional, Self
+from typing import TYPE_CHECKING, Optional, Self, cast
 
 import discord
 from discord.ext import commands
@@ -12,6 +12,7 @@ if TYPE_CHECKING:
     from asyncpg import Record
 
     from bot import Harmony
+    from cogs.infrastructure.ipc import IPC
     from utils import Context
 
 
@@ -133,13 +134,20 @@ class Blacklist(BaseCog):
         return not ctx.is_blacklisted()
 
     async def fill_cache(self) -> None:
+        """Loads the blacklists, replacing the cached ones only once both are loaded."""
+
         records = await self.bot.pool.fetch("SELECT * FROM blacklist")
-        for record in records:
-            self.bot.blacklist[record["user_id"]] = BlacklistItem(self, record)
+        blacklist = {record["user_id"]: BlacklistItem(self, record) for record in records}
 
         records = await self.bot.pool.fetch("SELECT * FROM guild_blacklist")
-        for record in records:
-            self.bot.guild_blacklist[record["guild_id"]] = GuildBlacklistItem(record)
+        guild_blacklist = {record["guild_id"]: GuildBlacklistItem(record) for record in records}
+
+        self.bot.blacklist = blacklist
+        self.bot.guild_blacklist = guild_blacklist
+
+    @commands.Cog.listener()
+    async def on_ipc_blacklist_update(self, _: None) -> None:
+        await self.fill_cache()
 
     async def add_blacklist(
         self, user: discord.User, *, guild: Optional[discord.Guild] = None, reason: Optional[str] = None
@@ -219,6 +227,8 @@ class Blacklist(BaseCog):
         else:
             await self.add_blacklist(user, guild=guild, reason=reason)
 
+        await cast("IPC", self.bot.cogs["infrastructure"]).broadcast("blacklist_update")
+
         reason = flags and f"`{flags.reason}`"
         embed = SuccessEmbed(description=f"Successfully blacklisted {user.mention}\nReason: {reason}.")
         await ctx.send(embed=embed)
@@ -240,6 +250,7 @@ class Blacklist(BaseCog):
         else:
             await self.remove_blacklist(user)
 
+        await cast("IPC", self.bot.cogs["infrastructure"]).broadcast("blacklist_update")
         embed = SuccessEmbed(description=f"Successfully removed the blacklist for {user.mention}.")
         await ctx.send(embed=embed)
 
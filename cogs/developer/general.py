@@ -17,7 +17,19 @@ from asyncpg import UniqueViolationError
 from discord.ext import commands
 
 from config import ANILIST_ID, DBL, TOP_GG
-from utils import BaseCog, BaseView, GenericError, Page, PrimaryEmbed, SecretView, SuccessEmbed, encrypt
+from utils import (
+    BaseCog,
+    BaseView,
+    GenericError,
+    Page,
+    Paginator,
+    PrimaryEmbed,
+    SecretView,
+    SuccessEmbed,
+    encrypt,
+    get_pending_migrations,
+    load_migrations,
+)
 
 if TYPE_CHECKING:
     from bot import Harmony
@@ -72,6 +84,107 @@ class General(BaseCog):
         except Exception as exc:
             await ctx.author.send(f"You fucked up: ```py\n{'\n'.join(format_exception(exc))}\n```")
 
+    @commands.command()
+    async def migrations(self, ctx: Context):
+        """Shows the schema migrations that haven't been applied yet."""
+
+        pending = await get_pending_migrations(ctx.pool, load_migrations())
+        if not pending:
+            return await ctx.send(embed=SuccessEmbed(description="The schema is up to date."))
+
+        lines = [f"* `{m.version:04d}_{m.name}`{'' if m.transactional else ' (no transaction)'}" for m in pending]
+        embed = PrimaryEmbed(title="Pending Migrations", description="\n".join(lines))
+        embed.set_footer(text="Pending migrations are applied on the next restart.")
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    async def startup(self, ctx: Context):
+        """Shows how long each phase of the startup took."""
+
+        phases = self.bot.startup_phases
+        value = "\n".join(f"`{name:<10}` {seconds:.2f}s" for name, seconds in phases.items())
+        embed = PrimaryEmbed(title="Startup", description=f"Total: {sum(phases.values()):.2f}s\n\n{value}")
+
+        timings = sorted(self.bot.extension_timings.items(), key=lambda item: sum(item[1]), reverse=True)
+        value = "\n".join(f"`{name:<20}` import {imp:.2f}s \N{EM DASH} setup {setup:.2f}s" for name, (imp, setup) in timings)
+        embed.add_field(name="Extensions", value=value or "None", inline=False)
+
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    async def offload(self, ctx: Context):
+        """Shows the timings of work offloaded to worker processes."""
+
+        service = self.bot.offload
+        lines = [
+            f"`{name:<12}` {m.count:,}x | avg `{m.average * 1000:.1f}ms` max `{m.max * 1000:.1f}ms`"
+            f" | {m.errors} failed, {m.rejected} rejected"
+            for name, m in service.metrics.items()
+        ]
+
+        embed = PrimaryEmbed(title="Offload", description="\n".join(lines) or "Nothing has been offloaded yet.")
+        embed.set_footer(text=f"{service.pending}/{service.max_pending} pending on {service.max_workers} workers")
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    async def queries(self, ctx: Context):
+        """Shows the timings of named queries, most expensive first."""
+
+        db = self.bot.db
+        timings = sorted(db.timings.items(), key=lambda item: item[1].total, reverse=True)
+        lines = [
+            f"`{name:<28}` {m.count:,}x | avg `{m.average * 1000:.1f}ms` max `{m.max * 1000:.1f}ms`"
+            f" | wait avg `{db.waits[name].average * 1000:.1f}ms`"
+            for name, m in timings[:20]
+        ]
+
+        pool = self.bot.pool
+        embed = PrimaryEmbed(title="Queries", description="\n".join(lines) or "No named queries have run yet.")
+        lanes = ", ".join(f"{lane.name} {lane.active}/{lane.limit} ({lane.waiting} waiting)" for lane in db.lanes.values())
+        embed.set_footer(text=f"{pool.get_size() - pool.get_idle_size()}/{pool.get_max_size()} connections in use | {lanes}")
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    async def stalls(self, ctx: Context):
+        """Shows the latest callbacks that blocked the event loop."""
+
+        monitor = self.bot.loop_monitor
+        embeds: list[discord.Embed] = []
+        for report in reversed(monitor.reports):
+            stack = report.stack[-3900:]  # The innermost frames are at the end
+            embed = PrimaryEmbed(
+                title=f"Blocked for {report.duration:.2f}s",
+                description=f"```py\n{stack}\n```",
+                timestamp=report.started_at.astimezone(),
+            )
+            embed.set_footer(text=f"Lag: {monitor.lag * 1000:.1f}ms, max {monitor.lag_max * 1000:.1f}ms")
+            embeds.append(embed)
+
+        if not embeds:
+            raise GenericError(f"The event loop hasn't been blocked for more than {monitor.threshold}s.")
+
+        await Paginator(embeds, ctx.author).start(ctx)
+
+    @commands.command()
+    async def traces(self, ctx: Context, count: int = 5):
+        """Shows the latest slow command traces."""
+
+        tracer = self.bot.tracer
+        embeds: list[discord.Embed] = []
+        for finished_at, span in list(reversed(tracer.slow))[:count]:
+            tree = "\n".join(span.format())[:3900]
+            embed = PrimaryEmbed(
+                title=f"{span.name} took {span.duration:.2f}s",
+                description=f"```\n{tree}\n```",
+                timestamp=finished_at.astimezone(),
+            )
+            embeds.append(embed)
+
+        if not embeds:
+            raise GenericError(f"No command has taken longer than {tracer.slow_threshold}s.")
+
+        await Paginator(embeds, ctx.author).start(ctx)
+
     @commands.command(aliases=["r"])
     async def reload(self, ctx: Context, extension: Optional[str] = None):
         """Reloads one or more extensions."""
@@ -1,31 +1,36 @@
 from __future__ import annotations
 
+import asyncio
 import datetime
+import hashlib
 import json
 import time
+import unicodedata
 from io import BytesIO
+from itertools import islice
 from os import getpid
 from sys import version_info
 from textwrap import dedent
-from typing import TYPE_CHECKING, Any, NamedTuple, Self, cast
+from typing import TYPE_CHECKING, Any, NamedTuple, Optional, Self, cast
 
 import aiohttp
 import asyncpg
 import discord
-import pygit2
-from cutlet import Cutlet
+from cachetools import TTLCache
 from discord.app_commands import describe
-from discord.ext import commands
-from jishaku.functools import executor_function
-from langcodes import Language
-from PIL import Image
-from psutil import Process, cpu_percent, virtual_memory
+from discord.ext import commands, tasks
 
 from config import JEYY_API, OWNER_IDS
 from utils import BaseCog, GenericError, PrimaryEmbed, argument_or_reference
 
+# pygit2, langcodes and psutil are imported by the commands that need them;
+# they are slow to import and most processes never use them.
+
 if TYPE_CHECKING:
+    import pygit2
+
     from bot import Harmony
+    from cogs.infrastructure.ipc import IPC
     from utils import Context
 
 
@@ -45,11 +50,115 @@ class AvatarView(discord.ui.View):
 class TranslatorResponse(NamedTuple):
     translated: str
     language: str
+    romaji: Optional[str] = None
+
+
+class TranslationCache:
+    """Recent translations, keyed on a hash of their normalised text."""
+
+    def __init__(self, *, maxsize: int = 1024, ttl: float = 3600) -> None:
+        self.cache: TTLCache[str, TranslatorResponse] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str) -> str:
+        normalised = " ".join(unicodedata.normalize("NFC", text).split())
+        return hashlib.sha256(normalised.encode()).hexdigest()
+
+    def get(self, text: str) -> Optional[TranslatorResponse]:
+        if (response := self.cache.get(self.key(text))) is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return response
+
+    def set(self, text: str, response: TranslatorResponse) -> None:
+        self.cache[self.key(text)] = response
+
+
+class BotInfoSnapshot(NamedTuple):
+    """The parts of botinfo local to this process, collected every minute."""
+
+    commits: list[str]
+    cpu: float
+    server_ram: int
+    process_ram: int
+
+
+class BotInfoCounts(NamedTuple):
+    """The parts of botinfo summed over every cluster, collected when botinfo is used."""
+
+    guild_count: int
+    commands_ran: int
+    collected_at: float
 
 
 class General(BaseCog):
     def __init__(self, bot: Harmony) -> None:
         super().__init__(bot)
+        self.translations = TranslationCache()
+        self.botinfo_snapshot: Optional[BotInfoSnapshot] = None
+        self.botinfo_counts: Optional[BotInfoCounts] = None
+        self.user_install_count: Optional[int] = None
+
+    async def cog_load(self) -> None:
+        self.bot.metrics.add_cache("translations", self.translations)
+        self.collect_botinfo.start()
+        self.refresh_application_info.start()
+
+    async def cog_unload(self) -> None:
+        self.collect_botinfo.cancel()
+        self.refresh_application_info.cancel()
+
+    @tasks.loop(minutes=1)
+    async def collect_botinfo(self) -> None:
+        try:
+            self.botinfo_snapshot = await self.take_botinfo_snapshot()
+        except Exception as exc:
+            self.bot.log.error("Failed to collect botinfo", exc_info=exc)
+
+    @tasks.loop(hours=1)
+    async def refresh_application_info(self) -> None:
+        try:
+            app = await self.bot.application_info()
+            self.user_install_count = app.approximate_user_install_count
+        except discord.HTTPException as exc:
+            self.bot.log.error("Failed to fetch application info", exc_info=exc)
+
+    @collect_botinfo.before_loop
+    @refresh_application_info.before_loop
+    async def before_botinfo(self) -> None:
+        await self.bot.wait_until_ready()
+
+    async def take_botinfo_snapshot(self) -> BotInfoSnapshot:
+        from psutil import Process, cpu_percent, virtual_memory
+
+        commits = await asyncio.to_thread(self.get_latest_commits, 5)
+
+        return BotInfoSnapshot(
+            commits=commits,
+            cpu=cpu_percent(),  # Since the last snapshot
+            server_ram=virtual_memory().used,
+            process_ram=Process(getpid()).memory_info().rss,
+        )
+
+    async def get_botinfo_counts(self, *, max_age: float = 300.0) -> BotInfoCounts:
+        """Returns the counts summed over every cluster, asking the clusters again if they're older than `max_age`."""
+
+        if (counts := self.botinfo_counts) is not None and time.monotonic() - counts.collected_at < max_age:
+            return counts
+
+        ipc = cast("IPC", self.bot.cogs["infrastructure"])
+        guild_count = sum(await ipc.request("guild_count"))
+
+        # Each cluster knows the written total as of its last flush, the largest being the latest, and its unwritten count
+        responses = await ipc.request("commands_ran")
+        commands_ran = max(total for total, _ in responses) + sum(pending for _, pending in responses)
+
+        self.botinfo_counts = counts = BotInfoCounts(guild_count, commands_ran, time.monotonic())
+        return counts
 
     @commands.guild_only()
     @commands.hybrid_command(aliases=["ui", "whois", "info"])
@@ -236,8 +345,10 @@ class General(BaseCog):
         return f"[`{partial}`](<https://github.com/itswilliboy/Harmony/commit/{full}>) {timestamp} | {msg}"
 
     def get_latest_commits(self, limit: int = 3) -> list[str]:
+        import pygit2
+
         repo = pygit2.Repository(".git")
-        commits = list(repo.walk(repo.head.target))[:limit]
+        commits = islice(repo.walk(repo.head.target), limit)
 
         return [self.format(commit) for commit in commits]
 
@@ -245,6 +356,14 @@ class General(BaseCog):
     async def botinfo(self, ctx: Context):
         """Displays information about the bot."""
 
+        if self.botinfo_snapshot is None or self.botinfo_counts is None:
+            await ctx.typing()
+
+        if (snapshot := self.botinfo_snapshot) is None:
+            snapshot = self.botinfo_snapshot = await self.take_botinfo_snapshot()
+
+        counts = await self.get_botinfo_counts()
+
         embed = PrimaryEmbed(title="Bot Information")
         embed.set_footer(text=f"Check out `{ctx.clean_prefix}ping` for more latency information.")
         embed.set_thumbnail(url=self.bot.user.display_avatar.url)
@@ -252,18 +371,13 @@ class General(BaseCog):
         if user := self.bot.get_user(OWNER_IDS[0]):
             embed.set_author(name=f"@{user.name}", icon_url=user.display_avatar.url)
 
-        app = await self.bot.application_info()
         embed.add_field(name="Started", value=discord.utils.format_dt(self.bot.started_at, "R"))
         embed.add_field(
-            name="Installs", value=f"{len(self.bot.guilds)} servers\n╰ {app.approximate_user_install_count} individual users"
+            name="Installs",
+            value=f"{counts.guild_count} servers\n╰ {self.user_install_count} individual users",
         )
 
-        embed.add_field(name="Latest Changes", value="\n".join(self.get_latest_commits(5)), inline=False)
-
-        process = Process(getpid())
-        cpu = cpu_percent()
-        server_ram = virtual_memory().used
-        process_ram = process.memory_info().rss
+        embed.add_field(name="Latest Changes", value="\n".join(snapshot.commits), inline=False)
 
         def formatted(bytes: int) -> str:
             def to_mebibytes(bytes_: int) -> int:
@@ -272,14 +386,13 @@ class General(BaseCog):
             return f"{to_mebibytes(bytes):,}"
 
         value = f"""
-            `CPU (Server) `: {cpu:1}%
-            `RAM (Server) `: {formatted(server_ram)} MiB
-            `RAM (Process)`: {formatted(process_ram)} MiB
+            `CPU (Server) `: {snapshot.cpu:1}%
+            `RAM (Server) `: {formatted(snapshot.server_ram)} MiB
+            `RAM (Process)`: {formatted(snapshot.process_ram)} MiB
         """
         embed.add_field(name="Process Information", value=dedent(value), inline=False)
 
-        command_runs: int = await ctx.pool.fetchval("SELECT SUM(count) FROM command_statistics")
-        embed.add_field(name="Commands Ran", value=f"{command_runs or 0:,}")
+        embed.add_field(name="Commands Ran", value=f"{counts.commands_ran:,}")
 
         version = f"{version_info.major}.{version_info.minor}.{version_info.micro}"
         value = f"""
@@ -312,17 +425,12 @@ class General(BaseCog):
         if not text:
             raise commands.MissingRequiredArgument(ctx.command.params["text"])
 
-        await ctx.typing()
-
-        query_ = {"client": "dict-chrome-ex", "sl": "auto", "tl": "en", "q": text}
-
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"  # noqa: E501
-        }
+        if (data := self.translations.get(text)) is None:
+            await ctx.typing()
+            data = await self.fetch_translation(ctx, text)
+            self.translations.set(text, data)
 
-        async with ctx.session.get("https://clients5.google.com/translate_a/t", params=query_, headers=headers) as resp:
-            json: list[Any] = (await resp.json())[0]
-            data = TranslatorResponse(json[0], json[1])
+        from langcodes import Language
 
         language = Language.make(data.language)
 
@@ -333,24 +441,24 @@ class General(BaseCog):
         )
         embed.add_field(name="Translated Text", value=data.translated, inline=False)
 
-        if data.language == "ja":
-            cutlet = Cutlet()
-            embed.insert_field_at(1, name="Romaji", value=cutlet.romaji(text), inline=False)
+        if data.romaji is not None:
+            embed.insert_field_at(1, name="Romaji", value=data.romaji, inline=False)
 
         await ctx.send(embed=embed)
 
-    @executor_function
-    def get_image_colour(self, buffer: BytesIO) -> discord.Colour:
-        """Gets the colour of the image by reading a specific pixel."""
+    async def fetch_translation(self, ctx: Context, text: str) -> TranslatorResponse:
+        query_ = {"client": "dict-chrome-ex", "sl": "auto", "tl": "en", "q": text}
 
-        with Image.open(buffer) as image:
-            pixels = image.load()
-            colour = cast("tuple[int, int]", pixels[255, 0])
-            colour = list(colour)
-            del colour[3]  # Delete the alpha value
+        headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"  # noqa: E501
+        }
+
+        async with ctx.session.get("https://clients5.google.com/translate_a/t", params=query_, headers=headers) as resp:
+            json: list[Any] = (await resp.json())[0]
+            translated, language = json[0], json[1]
 
-        buffer.seek(0)
-        return discord.Colour.from_rgb(*colour)
+        romaji = await self.bot.offload.romaji(text) if language == "ja" else None
+        return TranslatorResponse(translated, language, romaji)
 
     # Doesn't work without presence intent
     @commands.command(hidden=True)
@@ -377,7 +485,7 @@ class General(BaseCog):
         async with ctx.session.get("https://api.jeyy.xyz/v2/discord/spotify", params=params, headers=headers) as resp:
             buffer = BytesIO(await resp.read())
 
-        colour = await self.get_image_colour(buffer)
+        colour = discord.Colour.from_rgb(*await self.bot.offload.image_colour(buffer.getvalue()))
         file = discord.File(buffer, "spotify.png")
         embed = discord.Embed(colour=colour)
         embed.set_image(url="attachment://spotify.png")
@@ -156,6 +156,7 @@ class Help(BaseCog):
         bot.help_command = HelpCommand()
         bot.help_command.cog = self
 
-    def cog_unload(self) -> None:
+    async def cog_unload(self) -> None:
         self.bot.help_command = commands.MinimalHelpCommand()
         self.bot.help_command.cog = None
+        await super().cog_unload()
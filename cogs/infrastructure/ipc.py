@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import TYPE_CHECKING, Any, Callable, ClassVar, Optional
+from uuid import uuid4
+
+import asyncpg
+from discord.utils import maybe_coroutine
+
+from config import POSTGRES_CONNECTION_URI
+from utils import BaseCog
+
+if TYPE_CHECKING:
+    from bot import Harmony
+
+IPCHandler = Callable[[Any], Any]
+
+
+class IPC(BaseCog):
+    """Communication between clusters, over Postgres' LISTEN/NOTIFY.
+
+    Events are dispatched on every other cluster as `ipc_<event>`, and requests are answered by every cluster
+    (this one included) through the handler registered for the request's name.
+    """
+
+    CHANNEL: ClassVar[str] = "harmony_ipc"
+
+    def __init__(self, bot: Harmony) -> None:
+        super().__init__(bot)
+        self.ipc_connection: Optional[asyncpg.Connection[asyncpg.Record]] = None
+        self.ipc_handlers: dict[str, IPCHandler] = {"guild_count": lambda _: len(self.bot.guilds)}
+        self.ipc_requests: dict[str, tuple[asyncio.Future[None], list[Any]]] = {}
+        self.ipc_reconnect_task: Optional[asyncio.Task[None]] = None
+        self.ipc_tasks: set[asyncio.Task[None]] = set()  # Responses being sent, referenced so they can't be collected
+        self.ipc_closing = False
+
+    async def cog_load(self) -> None:
+        if self.bot.cluster_count > 1:
+            await self.ipc_connect()
+
+        await super().cog_load()
+
+    async def cog_unload(self) -> None:
+        self.ipc_closing = True
+        if self.ipc_reconnect_task is not None:
+            self.ipc_reconnect_task.cancel()
+
+        if self.ipc_connection is not None:
+            await self.ipc_connection.close()
+
+        await super().cog_unload()
+
+    async def ipc_connect(self) -> None:
+        """Opens the connection listening for IPC messages."""
+
+        self.ipc_connection = await asyncpg.connect(POSTGRES_CONNECTION_URI)
+        self.ipc_connection.add_termination_listener(self.ipc_terminated)
+        await self.ipc_connection.add_listener(self.CHANNEL, self.ipc_receive)
+
+    def ipc_terminated(self, _: Any) -> None:
+        if self.ipc_closing or (self.ipc_reconnect_task is not None and not self.ipc_reconnect_task.done()):
+            return
+
+        self.bot.log.warning("The IPC connection was lost, reconnecting")
+        self.ipc_reconnect_task = self.bot.loop.create_task(self.ipc_reconnect())
+
+    async def ipc_reconnect(self) -> None:
+        delay = 1.0
+        while not self.ipc_closing:
+            try:
+                await self.ipc_connect()
+
+            except (OSError, asyncpg.PostgresError) as exc:
+                self.bot.log.error("Failed to reconnect to IPC, retrying in %ss", delay, exc_info=exc)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60.0)
+
+            else:
+                self.bot.log.info("Reconnected to IPC")
+                return
+
+    def add_ipc_handler(self, name: str, handler: IPCHandler) -> None:
+        """Registers a handler answering requests with the given name."""
+
+        self.ipc_handlers[name] = handler
+
+    async def ipc_send(self, op: str, **payload: Any) -> None:
+        data = json.dumps({"op": op, "cluster": self.bot.cluster_id, **payload})
+        await self.bot.pool.execute("SELECT pg_notify($1, $2)", self.CHANNEL, data)
+
+    async def broadcast(self, event: str, data: Any = None) -> None:
+        """Dispatches `ipc_<event>` on every other cluster."""
+
+        if self.ipc_connection is not None:
+            await self.ipc_send("event", event=event, data=data)
+
+    async def request(self, name: str, data: Any = None, *, timeout: float = 2.0) -> list[Any]:
+        """Asks every cluster for something, returning the answers of the clusters that responded in time."""
+
+        responses = [await maybe_coroutine(self.ipc_handlers[name], data)]
+        if self.ipc_connection is None:
+            return responses
+
+        nonce = uuid4().hex
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self.ipc_requests[nonce] = (future, responses)
+
+        try:
+            await self.ipc_send("request", nonce=nonce, name=name, data=data)
+            await asyncio.wait_for(future, timeout)
+
+        except asyncio.TimeoutError:
+            self.bot.log.warning(
+                "IPC request %r timed out with %s/%s responses", name, len(responses), self.bot.cluster_count
+            )
+
+        finally:
+            self.ipc_requests.pop(nonce, None)
+
+        return responses
+
+    def ipc_receive(self, _: Any, __: int, ___: str, payload: str) -> None:
+        message = json.loads(payload)
+        op = message["op"]
+
+        if op == "response":
+            if pending := self.ipc_requests.get(message["nonce"]):
+                future, responses = pending
+                responses.append(message["data"])
+
+                if len(responses) >= self.bot.cluster_count and not future.done():
+                    future.set_result(None)
+
+            return
+
+        if message["cluster"] == self.bot.cluster_id:
+            return
+
+        if op == "event":
+            self.bot.dispatch(f"ipc_{message['event']}", message["data"])
+
+        elif op == "request" and (handler := self.ipc_handlers.get(message["name"])):
+            task = self.bot.loop.create_task(self.ipc_respond(message["nonce"], handler, message["data"]))
+            self.ipc_tasks.add(task)
+            task.add_done_callback(self.ipc_tasks.discard)
+
+    async def ipc_respond(self, nonce: str, handler: IPCHandler, data: Any) -> None:
+        await self.ipc_send("response", nonce=nonce, data=await maybe_coroutine(handler, data))
@@ -1,13 +1,14 @@
 from __future__ import annotations
 
 import re
+import time
 from typing import TYPE_CHECKING
 
 import discord
 from discord.ext import commands
 
 from config import DEFAULT_PREFIX
-from utils import BaseCog, GenericError, PrimaryEmbed, SuccessEmbed
+from utils import BaseCog, GenericError, PrimaryEmbed, SuccessEmbed, message_handler
 
 if TYPE_CHECKING:
     from bot import Harmony
@@ -22,26 +23,49 @@ class Prefix(BaseCog):
         bot.loop.create_task(self.check_prefixes())
 
     async def check_prefixes(self) -> None:
+        """Adds default prefixes for guilds joined and removes prefixes of guilds left while the bot was offline."""
+
         await self.bot.wait_until_ready()
-        prefixes = await self.bot.pool.fetch("SELECT * FROM prefixes")
-        guild_ids = {i.id for i in self.bot.guilds}
-        db_ids = {i["guild_id"] for i in prefixes}
-
-        if len(guild_ids) > len(db_ids):
-            for id in guild_ids:
-                await self.bot.pool.execute(
-                    "INSERT INTO prefixes VALUES ($1, $2) ON CONFLICT DO NOTHING", id, [DEFAULT_PREFIX]
-                )
-
-        else:
-            for id in db_ids:
-                if id in db_ids and id not in guild_ids:
-                    await self.bot.pool.execute("DELETE FROM prefixes WHERE guild_id = $1", id)
-
-    async def get_custom_prefixes(self, message: discord.Message) -> list[str]:
+        start = time.perf_counter()
+
+        guild_ids = {guild.id for guild in self.bot.guilds}
+
+        async with self.bot.pool.acquire() as conn, conn.transaction():
+            records = await conn.fetch("SELECT guild_id FROM prefixes")
+            # Other clusters own the rest of the guilds
+            db_ids = {record["guild_id"] for record in records if self.bot.owns_guild(record["guild_id"])}
+
+            joined = list(guild_ids - db_ids)
+            left = list(db_ids - guild_ids)
+
+            if joined:
+                query = """
+                    INSERT INTO prefixes (guild_id, prefixes)
+                        SELECT guild_id, $2::VARCHAR(5)[] FROM UNNEST($1::BIGINT[]) AS t(guild_id)
+                    ON CONFLICT DO NOTHING
+                """
+                await conn.execute(query, joined, [DEFAULT_PREFIX])
+
+            if left:
+                await conn.execute("DELETE FROM prefixes WHERE guild_id = ANY($1::BIGINT[])", left)
+
+        for id in joined:
+            self.bot.prefixes.reset(id)
+
+        for id in left:
+            self.bot.prefixes.discard(id)
+
+        self.bot.log.info(
+            "Reconciled prefixes in %.2fms (%s added, %s removed)",
+            (time.perf_counter() - start) * 1000,
+            len(joined),
+            len(left),
+        )
+
+    def get_custom_prefixes(self, message: discord.Message) -> tuple[str, ...]:
         if message.guild:
-            return await self.bot.pool.fetchval("SELECT prefixes FROM prefixes WHERE guild_id = $1", message.guild.id)
-        return []
+            return self.bot.prefixes.get_custom(message.guild.id)
+        return ()
 
     async def add_custom_prefix(self, guild: discord.abc.Snowflake, prefix: str) -> None:
         query = """
@@ -51,6 +75,7 @@ class Prefix(BaseCog):
                 guild_id = $2
         """
         await self.bot.pool.execute(query, prefix, guild.id)
+        self.bot.prefixes.add(guild.id, prefix)
 
     async def remove_custom_prefix(self, guild: discord.abc.Snowflake, prefix: str) -> None:
         query = """
@@ -60,6 +85,7 @@ class Prefix(BaseCog):
                 guild_id = $2
         """
         await self.bot.pool.execute(query, prefix, guild.id)
+        self.bot.prefixes.remove(guild.id, prefix)
 
     async def reset_prefixes(self, guild: discord.abc.Snowflake) -> None:
         query = """
@@ -69,19 +95,21 @@ class Prefix(BaseCog):
                 guild_id = $2
         """
         await self.bot.pool.execute(query, [DEFAULT_PREFIX], guild.id)
+        self.bot.prefixes.reset(guild.id)
 
     @commands.Cog.listener()
     async def on_guild_join(self, guild: discord.Guild) -> None:
         await self.bot.pool.execute("INSERT INTO prefixes VALUES ($1, $2)", guild.id, [DEFAULT_PREFIX])
+        self.bot.prefixes.reset(guild.id)
 
     @commands.Cog.listener()
     async def on_guild_remove(self, guild: discord.Guild) -> None:
         await self.bot.pool.execute("DELETE FROM prefixes WHERE guild_id = $1", guild.id)
+        self.bot.prefixes.discard(guild.id)
 
-    @commands.Cog.listener("on_message")
-    async def prefix_listener(self, message: discord.Message) -> None:
-        if (match := MENTION_REGEX.fullmatch(message.content)) and match and match.group(1) == str(self.bot.user.id):
-            ctx = await self.bot.get_context(message)
+    @message_handler()
+    async def prefix_listener(self, ctx: Context) -> None:
+        if (match := MENTION_REGEX.fullmatch(ctx.message.content)) and match and match.group(1) == str(self.bot.user.id):
             cmd = self.bot.get_command("prefix")
 
             await ctx.invoke(cmd)  # type: ignore
@@ -91,7 +119,7 @@ class Prefix(BaseCog):
     async def prefix(self, ctx: Context):
         """Displays the server's prefix."""
 
-        prefixes = await self.get_custom_prefixes(ctx.message)
+        prefixes = self.get_custom_prefixes(ctx.message)
         formatted = [f"`{pre}`" for pre in prefixes]
         formatted.insert(0, self.bot.user.mention)
 
@@ -113,7 +141,7 @@ class Prefix(BaseCog):
         if len(prefix) > 5:
             raise GenericError("The prefix needs to be shorter than 5 characters.")
 
-        prefixes = await self.get_custom_prefixes(ctx.message)
+        prefixes = self.get_custom_prefixes(ctx.message)
         if len(prefixes) - 2 >= 5:
             raise GenericError("You cannot have more than 5 custom prefixes.")
 
@@ -121,7 +149,6 @@ class Prefix(BaseCog):
             raise GenericError("That prefix already exists.")
 
         await self.add_custom_prefix(ctx.guild, prefix)
-        ctx.bot.prefix_cache.pop(ctx.guild.id)
         embed = SuccessEmbed(description=f"Successfully added `{prefix}` as a prefix.")
         await ctx.send(embed=embed)
 
@@ -133,11 +160,10 @@ class Prefix(BaseCog):
         if prefix == DEFAULT_PREFIX:
             raise GenericError("You can't remove the default prefix.")
 
-        if prefix not in (await self.get_custom_prefixes(ctx.message)):
+        if prefix not in self.get_custom_prefixes(ctx.message):
             raise GenericError("That prefix doesn't exist.")
 
         await self.remove_custom_prefix(ctx.guild, prefix)
-        ctx.bot.prefix_cache.pop(ctx.guild.id)
         embed = SuccessEmbed(description=f"Successfully removed `{prefix}` as a prefix.")
         await ctx.send(embed=embed)
 
@@ -147,6 +173,5 @@ class Prefix(BaseCog):
         """Resets the server's prefixes."""
 
         await self.reset_prefixes(ctx.guild)
-        ctx.bot.prefix_cache.pop(ctx.guild.id)
         embed = SuccessEmbed(description="Successfully reset all of the prefixes.")
         await ctx.send(embed=embed)
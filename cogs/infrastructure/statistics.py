@@ -1,57 +1,369 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Optional, cast
+import asyncio
+import datetime
+import random
+import time
+from bisect import bisect_left
+from typing import TYPE_CHECKING, ClassVar, NamedTuple, Optional, cast
 
 import discord
 from discord.app_commands import describe
-from discord.ext import commands
+from discord.ext import commands, tasks
 
-from utils import BaseCog, Context, Paginator, PrimaryEmbed, plural
+from utils import BaseCog, Context, Paginator, PrimaryEmbed, Query, message_handler, plural, query
 
 if TYPE_CHECKING:
     from bot import Harmony
 
+    from .ipc import IPC
+
+
+class MessageStatisticsBuffer:
+    """Accumulates message counts in memory and writes them to the database in bulk."""
+
+    QUERY: ClassVar[Query] = query(
+        "statistics.flush_messages",
+        """
+            INSERT INTO message_statistics (guild_id, user_id, count, bot)
+                SELECT * FROM UNNEST($1::BIGINT[], $2::BIGINT[], $3::INTEGER[], $4::BOOLEAN[])
+            ON CONFLICT (guild_id, user_id)
+                DO UPDATE
+                SET count = message_statistics.count + EXCLUDED.count
+        """,
+    )
+
+    def __init__(self, bot: Harmony, *, max_keys: int = 50_000) -> None:
+        self.bot = bot
+        self.max_keys = max_keys
+
+        self.pending: dict[tuple[int, int], list[int]] = {}  # (guild_id, user_id): [count, bot]
+        self.lock = asyncio.Lock()
+        self.flush_task: Optional[asyncio.Task[None]] = None  # An early flush, when the buffer is full
+
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.last_flush_rows = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def add(self, guild_id: int, user_id: int, bot: bool) -> None:
+        """Counts a message, flushing early if the buffer is full."""
+
+        key = (guild_id, user_id)
+        if (entry := self.pending.get(key)) is not None:
+            entry[0] += 1
+            return
+
+        if len(self.pending) >= self.max_keys:
+            if self.lock.locked():
+                # A flush is already running and the buffer is still full, drop the message rather than grow unbounded.
+                self.dropped += 1
+                return
+
+            if self.flush_task is None or self.flush_task.done():
+                self.flush_task = self.bot.loop.create_task(self.flush())
+
+        self.pending[key] = [1, bot]
+
+    def get(self, guild_id: int, user_id: int) -> int:
+        """Returns the amount of messages that haven't been written yet."""
+
+        entry = self.pending.get((guild_id, user_id))
+        return entry[0] if entry else 0
+
+    async def flush(self) -> None:
+        """Writes all pending counts to the database in one statement."""
+
+        async with self.lock:
+            if not self.pending:
+                return
+
+            batch, self.pending = self.pending, {}
+
+            guild_ids: list[int] = []
+            user_ids: list[int] = []
+            counts: list[int] = []
+            bots: list[bool] = []
+            for (guild_id, user_id), (count, bot) in batch.items():
+                guild_ids.append(guild_id)
+                user_ids.append(user_id)
+                counts.append(count)
+                bots.append(bool(bot))
+
+            start = time.perf_counter()
+            try:
+                await self.bot.db.execute(self.QUERY, guild_ids, user_ids, counts, bots)
+
+            except Exception as exc:
+                self.bot.log.error("Failed to flush %s message statistics rows", len(batch), exc_info=exc)
+                self.restore(batch)
+                return
+
+            latency = time.perf_counter() - start
+
+            self.flushes += 1
+            self.rows_flushed += len(batch)
+            self.last_flush_rows = len(batch)
+            self.last_flush_latency = latency
+            self.max_flush_latency = max(self.max_flush_latency, latency)
+
+    def restore(self, batch: dict[tuple[int, int], list[int]]) -> None:
+        """Merges a batch that failed to be written back into the buffer, as far as the cap allows."""
+
+        for key, (count, bot) in batch.items():
+            if (entry := self.pending.get(key)) is not None:
+                entry[0] += count
+
+            elif len(self.pending) < self.max_keys:
+                self.pending[key] = [count, bot]
+
+            else:
+                self.dropped += count
+
+
+class CommandKey(NamedTuple):
+    minute: int
+    command: str
+    guild_id: int  # 0 for DMs
+    success: bool
+
+
+class CommandBucket:
+    """Per-minute latency samples and histogram of a command."""
+
+    MAX_SAMPLES: ClassVar[int] = 512
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.histogram = [0] * (len(CommandStatisticsRecorder.HISTOGRAM_BOUNDS) + 1)
+        self.samples: list[float] = []
+        self.max = 0.0
+
+    def add(self, latency: float) -> None:
+        self.count += 1
+        self.histogram[bisect_left(CommandStatisticsRecorder.HISTOGRAM_BOUNDS, latency)] += 1
+        self.max = max(self.max, latency)
+
+        if len(self.samples) < self.MAX_SAMPLES:
+            self.samples.append(latency)
+
+        elif (index := random.randrange(self.count)) < self.MAX_SAMPLES:  # Reservoir sampling
+            self.samples[index] = latency
+
+    def percentiles(self) -> tuple[float, float, float]:
+        """Returns the p50, p95 and p99 latencies."""
+
+        ordered = sorted(self.samples)
+        last = len(ordered) - 1
+        return tuple(ordered[round(last * q)] for q in (0.50, 0.95, 0.99))  # type: ignore
+
+
+class CommandStatisticsRecorder:
+    """Records command usage and latency into per-minute buckets that are written to the database in batches."""
+
+    HISTOGRAM_BOUNDS: ClassVar[tuple[float, ...]] = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)  # ms
+
+    QUERY: ClassVar[Query] = query(
+        "statistics.flush_commands",
+        """
+            INSERT INTO command_usage (bucket, command, guild_id, success, count, p50, p95, p99, max, histogram)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+            ON CONFLICT (bucket, command, guild_id, success)
+                DO UPDATE
+                SET count = command_usage.count + EXCLUDED.count,
+                    p50 = (command_usage.p50 * command_usage.count + EXCLUDED.p50 * EXCLUDED.count)
+                        / (command_usage.count + EXCLUDED.count),
+                    p95 = (command_usage.p95 * command_usage.count + EXCLUDED.p95 * EXCLUDED.count)
+                        / (command_usage.count + EXCLUDED.count),
+                    p99 = (command_usage.p99 * command_usage.count + EXCLUDED.p99 * EXCLUDED.count)
+                        / (command_usage.count + EXCLUDED.count),
+                    max = GREATEST(command_usage.max, EXCLUDED.max),
+                    histogram = ARRAY(
+                        SELECT a + b FROM UNNEST(command_usage.histogram, EXCLUDED.histogram) AS h(a, b)
+                    )
+        """,
+    )
+
+    ADD_TOTAL_QUERY: ClassVar[Query] = query(
+        "statistics.add_command_total", "UPDATE command_totals SET count = count + $1 RETURNING count"
+    )
+    GET_TOTAL_QUERY: ClassVar[Query] = query("statistics.get_command_total", "SELECT count FROM command_totals")
+
+    # Buckets older than this are deleted; they're only used for recent latencies, the total is kept separately
+    PRUNE_QUERY: ClassVar[Query] = query(
+        "statistics.prune_commands", "DELETE FROM command_usage WHERE bucket < NOW() - make_interval(days => $1)"
+    )
+
+    def __init__(self, bot: Harmony, *, max_keys: int = 10_000, retention_days: int = 30) -> None:
+        self.bot = bot
+        self.max_keys = max_keys
+        self.retention_days = retention_days
+
+        self.buckets: dict[CommandKey, CommandBucket] = {}
+        self.lock = asyncio.Lock()
+        self.total = 0  # The written total of every cluster, as of this cluster's last flush
+
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.last_flush_rows = 0
+        self.last_flush_latency = 0.0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self.buckets)
+
+    @property
+    def pending(self) -> int:
+        """The amount of commands recorded but not yet written to the database."""
+
+        return sum(bucket.count for bucket in self.buckets.values())
+
+    async def load_total(self) -> None:
+        """Loads the written total of commands ran, which every flush then updates."""
+
+        self.total = await self.bot.db.fetchval(self.GET_TOTAL_QUERY) or 0
+
+    async def prune(self) -> None:
+        await self.bot.db.execute(self.PRUNE_QUERY, self.retention_days)
+
+    def record(self, command: str, guild_id: Optional[int], success: bool, latency: float) -> None:
+        """Records a command invocation, `latency` being in milliseconds."""
+
+        key = CommandKey(int(time.time() // 60), command, guild_id or 0, success)
+        if (bucket := self.buckets.get(key)) is None:
+            if len(self.buckets) >= self.max_keys:
+                self.dropped += 1
+                return
+
+            bucket = self.buckets[key] = CommandBucket()
+
+        bucket.add(latency)
+
+    async def flush(self, *, everything: bool = False) -> None:
+        """Writes all finished minutes (or every bucket, if `everything` is set) to the database."""
+
+        async with self.lock:
+            current = int(time.time() // 60)
+            keys = [key for key in self.buckets if everything or key.minute < current]
+            if not keys:
+                return
+
+            batch = {key: self.buckets.pop(key) for key in keys}
+
+            rows: list[tuple[object, ...]] = []
+            for key, bucket in batch.items():
+                p50, p95, p99 = bucket.percentiles()
+                rows.append(
+                    (
+                        datetime.datetime.fromtimestamp(key.minute * 60, datetime.UTC),
+                        key.command,
+                        key.guild_id,
+                        key.success,
+                        bucket.count,
+                        p50,
+                        p95,
+                        p99,
+                        bucket.max,
+                        bucket.histogram,
+                    )
+                )
+
+            start = time.perf_counter()
+            try:
+                await self.bot.db.executemany(self.QUERY, rows)
+
+            except Exception as exc:
+                self.bot.log.error("Failed to flush %s command usage rows", len(rows), exc_info=exc)
+                for key, bucket in batch.items():
+                    self.buckets.setdefault(key, bucket)
+                return
+
+            self.flushes += 1
+            self.rows_flushed += len(rows)
+            self.last_flush_rows = len(rows)
+            self.last_flush_latency = time.perf_counter() - start
+
+            count = sum(bucket.count for bucket in batch.values())
+            try:
+                # Includes what the other clusters have written, so the largest total among the clusters is the latest
+                self.total = await self.bot.db.fetchval(self.ADD_TOTAL_QUERY, count) or self.total + count
+            except Exception as exc:
+                self.bot.log.error("Failed to add %s commands to the total", count, exc_info=exc)
+
 
 class Statistics(BaseCog):
     def __init__(self, bot: Harmony) -> None:
         super().__init__(bot)
+        self.message_buffer = MessageStatisticsBuffer(bot)
+        self.command_recorder = CommandStatisticsRecorder(bot)
+
+    async def cog_load(self) -> None:
+        recorder = self.command_recorder
+        await recorder.load_total()
+        cast("IPC", self).add_ipc_handler("commands_ran", lambda _: [recorder.total, recorder.pending])
+
+        self.flush_message_statistics.start()
+        self.flush_command_statistics.start()
+        if self.bot.cluster_id == 0:
+            self.prune_command_statistics.start()
+        await super().cog_load()
+
+    async def cog_unload(self) -> None:
+        self.flush_message_statistics.cancel()
+        self.flush_command_statistics.cancel()
+        self.prune_command_statistics.cancel()
+        await self.message_buffer.flush()
+        await self.command_recorder.flush(everything=True)
+        await super().cog_unload()
+
+    @tasks.loop(seconds=15.0)
+    async def flush_message_statistics(self) -> None:
+        await self.message_buffer.flush()
+
+    @tasks.loop(seconds=60.0)
+    async def flush_command_statistics(self) -> None:
+        await self.command_recorder.flush()
+
+    @tasks.loop(hours=1.0)
+    async def prune_command_statistics(self) -> None:
+        try:
+            await self.command_recorder.prune()
+        except Exception as exc:
+            self.bot.log.error("Failed to prune command usage", exc_info=exc)
+
+    def record_command(self, ctx: Context, success: bool) -> None:
+        if ctx.command is None:
+            return
+
+        elapsed = time.perf_counter() - ctx.started_at
+        guild = cast("Optional[discord.Guild]", ctx.guild)
+        self.command_recorder.record(ctx.command.qualified_name, guild and guild.id, success, elapsed * 1000)
+        self.bot.metrics.observe_command(ctx.command.qualified_name, elapsed, error=not success)
+
+        if ctx.trace is not None:
+            ctx.trace.attributes["success"] = success
+            self.bot.tracer.finish_trace(ctx.trace)
 
     @commands.Cog.listener()
     async def on_command_completion(self, ctx: Context):
-        if cast("Optional[discord.Guild]", ctx.guild) is None:
-            return
+        self.record_command(ctx, True)
 
-        await ctx.pool.execute(
-            """
-            INSERT INTO command_statistics
-                VALUES ($1, 1)
-            ON CONFLICT (guild_id)
-                DO UPDATE
-                SET count = command_statistics.count + 1
-            """,
-            ctx.guild.id,
-        )
+    @commands.Cog.listener("on_command_error")
+    async def command_error_listener(self, ctx: Context, _: Exception):
+        self.record_command(ctx, False)
 
-    @commands.Cog.listener("on_message")
-    async def message_listener(self, message: discord.Message):
+    @message_handler(bots=True, blacklisted=True)
+    async def message_listener(self, ctx: Context):
+        message = ctx.message
         if message.guild is None:
             return
 
-        if message.webhook_id is not None:
-            return
-
-        await self.bot.pool.execute(
-            """
-            INSERT INTO message_statistics
-                VALUES ($1, $2, 1, $3)
-            ON CONFLICT (guild_id, user_id)
-                DO UPDATE
-                SET count = message_statistics.count + 1
-            """,
-            message.guild.id,
-            message.author.id,
-            message.author.bot,
-        )
+        self.message_buffer.add(message.guild.id, message.author.id, message.author.bot)
 
     @commands.hybrid_group(aliases=["msgs"])
     @describe(member="The member to view the messages for")
@@ -60,6 +372,7 @@ class Statistics(BaseCog):
         res: int = await ctx.pool.fetchval(
             "SELECT count FROM message_statistics WHERE user_id = $1 AND guild_id = $2", member.id, ctx.guild.id
         )
+        res = (res or 0) + self.message_buffer.get(ctx.guild.id, member.id)
 
         is_author = ctx.author == member
         apos = "'"  # :^)
@@ -100,3 +413,48 @@ class Statistics(BaseCog):
             embeds.append(embed)
 
         await Paginator(embeds, ctx.author).start(ctx)
+
+    @commands.is_owner()
+    @commands.command(hidden=True)
+    async def statsbuffer(self, ctx: Context):
+        buffer = self.message_buffer
+        await ctx.send(
+            f"Pending rows: `{len(buffer):,}` / `{buffer.max_keys:,}`\n"
+            f"Flushes: `{buffer.flushes:,}` (`{buffer.rows_flushed:,}` rows)\n"
+            f"Last flush: `{buffer.last_flush_rows:,}` rows in `{buffer.last_flush_latency * 1000:.2f}ms`\n"
+            f"Slowest flush: `{buffer.max_flush_latency * 1000:.2f}ms`\n"
+            f"Dropped messages: `{buffer.dropped:,}`"
+        )
+
+    @commands.is_owner()
+    @commands.command(hidden=True)
+    async def slowcommands(self, ctx: Context, minutes: int = 60):
+        """Shows the slowest commands over the last couple of minutes."""
+
+        # Only the finished minutes, the current one keeps being recorded into
+        await self.command_recorder.flush()
+
+        query = """
+            SELECT
+                command,
+                SUM(count) AS count,
+                SUM(p50 * count) / SUM(count) AS p50,
+                MAX(p95) AS p95,
+                MAX(p99) AS p99,
+                COALESCE(SUM(count) FILTER (WHERE NOT success), 0) AS failures
+            FROM command_usage
+                WHERE bucket >= NOW() - make_interval(mins => $1)
+            GROUP BY command
+            ORDER BY p95 DESC
+            LIMIT 15
+        """
+        records = await ctx.pool.fetch(query, minutes)
+        if not records:
+            return await ctx.send("No commands have been ran in that timeframe.")
+
+        lines = [
+            f"`{r['command']:<20}` {r['count']:>5,}x | p50 `{r['p50']:.0f}ms` p95 `{r['p95']:.0f}ms` p99 `{r['p99']:.0f}ms`"
+            + (f" | {r['failures']} failed" if r["failures"] else "")
+            for r in records
+        ]
+        await ctx.send(embed=PrimaryEmbed(title=f"Slowest Commands ({minutes}m)", description="\n".join(lines)))
@@ -5,11 +5,16 @@ from typing import TYPE_CHECKING, Any, Optional, Self
 import discord
 from discord.ext import commands
 
-from utils import BaseCog, Context, GenericError, SuccessEmbed
+from utils import BaseCog, Context, GenericError, SuccessEmbed, query
 
 if TYPE_CHECKING:
     from asyncpg import Record
 
+SET_ENABLED_QUERY = query("logging.set_enabled", "UPDATE logging_config SET enabled = $1 WHERE guild_id = $2")
+DELETE_CONFIG_QUERY = query("logging.delete", "DELETE FROM logging_config WHERE guild_id = $1")
+CREATE_CONFIG_QUERY = query("logging.create", "INSERT INTO logging_config VALUES ($1, $2, $3) RETURNING *")
+GET_CONFIG_QUERY = query("logging.get", "SELECT * FROM logging_config WHERE guild_id = $1")
+
 
 class LoggingConfig:
     def __init__(self, cog: Logging, guild_id: int, enabled: bool, channel_id: int) -> None:
@@ -25,25 +30,18 @@ class LoggingConfig:
     async def set_enabled(self, enabled: bool) -> None:
         """Sets the enabled-state of the logging config."""
 
-        query = """
-            UPDATE logging_config
-                SET enabled = $1
-            WHERE guild_id = $2
-        """
-        await self.cog.bot.pool.execute(query, enabled, self.guild_id)
+        await self.cog.bot.db.execute(SET_ENABLED_QUERY, enabled, self.guild_id)
         self.enabled = enabled
 
     async def delete(self) -> None:
-        query = "DELETE FROM logging_config WHERE guild_id = $1"
-        await self.cog.bot.pool.execute(query, self.guild_id)
+        await self.cog.bot.db.execute(DELETE_CONFIG_QUERY, self.guild_id)
 
 
 class Logging(BaseCog):
     async def create_guild_config(self, guild: discord.abc.Snowflake, channel: discord.TextChannel) -> LoggingConfig:
         """Creates a new logging config for a guild."""
 
-        query = "INSERT INTO logging_config VALUES ($1, $2, $3) RETURNING *"
-        res = await self.bot.pool.fetchrow(query, guild.id, True, channel.id)
+        res = await self.bot.db.fetchrow(CREATE_CONFIG_QUERY, guild.id, True, channel.id)
 
         assert res is not None
         return LoggingConfig.from_record(self, res)
@@ -51,8 +49,7 @@ class Logging(BaseCog):
     async def get_guild_config(self, guild: discord.abc.Snowflake) -> Optional[LoggingConfig]:
         """Returns the guild's logging config, if any."""
 
-        query = "SELECT * FROM logging_config WHERE guild_id = $1"
-        res = await self.bot.pool.fetchrow(query, guild.id)
+        res = await self.bot.db.fetchrow(GET_CONFIG_QUERY, guild.id)
 
         if res is not None:
             return LoggingConfig.from_record(self, res)
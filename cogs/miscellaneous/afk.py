@@ -18,7 +18,9 @@ from utils import (
     Paginator,
     PrimaryEmbed,
     SuccessEmbed,
+    message_handler,
     meth_snowflake_key,
+    query,
 )
 
 if TYPE_CHECKING:
@@ -29,6 +31,40 @@ if TYPE_CHECKING:
     from bot import Harmony
 
 
+SET_MENTIONED_QUERY = query("afk.set_mentioned", "UPDATE afk SET mentioned = true WHERE user_id = $1")
+ADD_MENTION_QUERY = query(
+    "afk.add_mention",
+    """
+    INSERT INTO afk_mentions
+        (
+            user_id,
+            mentioner_id,
+            guild_id,
+            channel_id,
+            message_id,
+            is_reply
+        )
+    VALUES
+        ($1, $2, $3, $4, $5, $6)
+    """,
+)
+SET_AFK_QUERY = query(
+    "afk.set",
+    """
+    INSERT INTO afk (user_id, reason)
+        VALUES ($1, $2)
+    ON CONFLICT (user_id)
+        DO UPDATE
+    SET reason = $2,
+    timestamp = current_timestamp
+    """,
+)
+UNSET_AFK_QUERY = query("afk.unset", "DELETE FROM afk WHERE user_id = $1")
+GET_AFK_QUERY = query("afk.get", "SELECT * FROM afk WHERE user_id = $1")
+GET_MENTIONS_QUERY = query("afk.get_mentions", "SELECT * FROM afk_mentions WHERE user_id = $1")
+CLEAR_MENTIONS_QUERY = query("afk.clear_mentions", "DELETE FROM afk_mentions WHERE user_id = $1")
+
+
 @dataclass
 class AfkRecord:
     user_id: int
@@ -50,29 +86,11 @@ class AfkRecord:
         message_id: int,
         is_reply: bool,
     ) -> None:
-        query = """
-            UPDATE afk
-            SET mentioned = true
-                WHERE user_id = $1
-        """
-        await bot.pool.execute(query, self.user_id)
+        await bot.db.execute(SET_MENTIONED_QUERY, self.user_id)
         self.mentioned = True
 
-        query = """
-            INSERT INTO afk_mentions
-                (
-                    user_id,
-                    mentioner_id,
-                    guild_id,
-                    channel_id,
-                    message_id,
-                    is_reply
-                )
-            VALUES
-                ($1, $2, $3, $4, $5, $6)
-        """
-        await bot.pool.execute(
-            query,
+        await bot.db.execute(
+            ADD_MENTION_QUERY,
             user_id,
             mentioner_id,
             guild_id,
@@ -154,47 +172,35 @@ class Afk(BaseCog):
         self.afk_cache: TTLCache[int, AfkRecord] = TTLCache(maxsize=100, ttl=600)
 
     async def set_afk(self, user: discord.abc.Snowflake, reason: Optional[str] = None) -> None:
-        query = """
-            INSERT INTO afk (user_id, reason)
-                VALUES ($1, $2)
-            ON CONFLICT (user_id)
-                DO UPDATE
-            SET reason = $2,
-            timestamp = current_timestamp
-        """
-        await self.bot.pool.execute(query, user.id, reason)
+        await self.bot.db.execute(SET_AFK_QUERY, user.id, reason)
         self.afk_cache.pop(user.id, None)
 
     async def unset_afk(self, user: discord.abc.Snowflake) -> None:
-        query = "DELETE FROM afk WHERE user_id = $1"
-        await self.bot.pool.execute(query, user.id)
+        await self.bot.db.execute(UNSET_AFK_QUERY, user.id)
         self.afk_cache.pop(user.id)
 
     @cachedmethod(lambda self: self.afk_cache, key=meth_snowflake_key)
     async def get_afk(self, user: discord.abc.Snowflake) -> Optional[AfkRecord]:
-        query = "SELECT * FROM afk WHERE user_id = $1"
-        record = await self.bot.pool.fetchrow(query, user.id)
+        record = await self.bot.db.fetchrow(GET_AFK_QUERY, user.id)
 
         if record is None:
             return None
         return AfkRecord.from_record(record)
 
     async def get_mentions(self, user: discord.abc.Snowflake) -> list[AfkMention]:
-        query = "SELECT * FROM afk_mentions WHERE user_id = $1"
-        records = await self.bot.pool.fetch(query, user.id)
+        records = await self.bot.db.fetch(GET_MENTIONS_QUERY, user.id)
 
         return [AfkMention.from_record(record) for record in records]
 
     async def clear_mentions(self, user: discord.abc.Snowflake) -> None:
-        query = "DELETE FROM afk_mentions WHERE user_id = $1"
-        await self.bot.pool.execute(query, user.id)
+        await self.bot.db.execute(CLEAR_MENTIONS_QUERY, user.id)
 
-    @commands.Cog.listener("on_message")
-    async def afk_listener(self, message: discord.Message):
+    @message_handler()
+    async def afk_listener(self, ctx: Context):
+        message = ctx.message
         author = message.author
 
-        ctx = await self.bot.get_context(message)
-        if ctx.command or ctx.is_blacklisted() or message.author.bot:
+        if ctx.command:
             return
 
         if afk := await self.get_afk(author):
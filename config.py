@@ -31,6 +31,32 @@ ANILIST_URL = (
 )
 ANILIST_REDIRECT = getenv("ANILIST_REDIRECT")
 
+# Sharding; SHARD_COUNT defaults to Discord's recommendation, and the shards are split evenly between CLUSTER_COUNT processes
+SHARD_COUNT = int(getenv("SHARD_COUNT") or 0) or None
+CLUSTER_COUNT = int(getenv("CLUSTER_COUNT") or 1)
+
+# Size of the database connection pool, per cluster
+POOL_MIN_SIZE = int(getenv("POOL_MIN_SIZE") or 2)
+POOL_MAX_SIZE = int(getenv("POOL_MAX_SIZE") or 10)
+POOL_RESERVED = int(getenv("POOL_RESERVED") or 3)  # Connections kept free of background work, for commands
+
+# Metrics are served on METRICS_PORT + the cluster's ID, set it to 0 to disable them
+METRICS_HOST = getenv("METRICS_HOST") or "0.0.0.0"
+METRICS_PORT = int(getenv("METRICS_PORT") or 8013)
+
+# Command traces are appended to TRACE_PATH (set it to an empty string to disable the file), and the ones slower than
+# TRACE_SLOW_THRESHOLD seconds are kept in memory for the `traces` command
+TRACE_PATH = getenv("TRACE_PATH", "logs/traces.jsonl")
+TRACE_SLOW_THRESHOLD = float(getenv("TRACE_SLOW_THRESHOLD") or 1.0)
+
+# Offload worker processes are started on their first task, each loading the Japanese dictionary (~100 MiB) then.
+# Setting OFFLOAD_WARM starts them with the bot instead, so the first task is fast, at the cost of that memory in every
+# cluster's workers even if they're never used
+OFFLOAD_WARM = getenv("OFFLOAD_WARM", "").lower() in ("1", "true", "yes")
+
+# Callbacks holding the event loop for longer than this many seconds have their stack recorded
+LOOP_STALL_THRESHOLD = float(getenv("LOOP_STALL_THRESHOLD") or 0.25)
+
 assert TOKEN
 assert DEFAULT_PREFIX
 assert POSTGRES_CONNECTION_URI
@@ -1,5 +1,3 @@
-BEGIN;
-
 CREATE TABLE IF NOT EXISTS prefixes(
     guild_id BIGINT PRIMARY KEY,
     prefixes VARCHAR(5)[] NOT NULL
@@ -92,5 +90,3 @@ CREATE TABLE IF NOT EXISTS afk_mentions(
     message_id BIGINT NOT NULL,
     is_reply BOOLEAN NOT NULL
 );
-
-COMMIT;
\ No newline at end of file
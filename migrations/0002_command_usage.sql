@@ -0,0 +1,15 @@
+CREATE TABLE IF NOT EXISTS command_usage(
+    bucket TIMESTAMPTZ NOT NULL,
+    command TEXT NOT NULL,
+    guild_id BIGINT NOT NULL,
+    success BOOLEAN NOT NULL,
+    count INTEGER NOT NULL,
+    p50 REAL NOT NULL,
+    p95 REAL NOT NULL,
+    p99 REAL NOT NULL,
+    max REAL NOT NULL,
+    histogram INTEGER[] NOT NULL,
+    PRIMARY KEY (bucket, command, guild_id, success)
+);
+
+CREATE INDEX IF NOT EXISTS command_usage_command_idx ON command_usage (command, bucket);
@@ -0,0 +1,16 @@
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conrelid = 'inline_search_optout'::regclass AND contype = 'p'
+    ) THEN
+        DELETE FROM inline_search_optout WHERE user_id IS NULL;
+        DELETE FROM inline_search_optout a
+            USING inline_search_optout b
+            WHERE a.user_id = b.user_id AND a.ctid < b.ctid;
+        ALTER TABLE inline_search_optout ADD PRIMARY KEY (user_id);
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS inline_search_guild_optout(
+    guild_id BIGINT PRIMARY KEY
+);
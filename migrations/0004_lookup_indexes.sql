@@ -0,0 +1,12 @@
+-- no-transaction
+-- Built concurrently so that busy tables aren't locked against writes while the indexes are created.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS afk_mentions_user_id_idx ON afk_mentions (user_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS error_reports_status_idx ON error_reports (status, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS message_statistics_leaderboard_idx ON message_statistics (guild_id, count DESC);
+
+DROP INDEX CONCURRENTLY IF EXISTS prefixes_guild_id_idx;
+
+DROP INDEX CONCURRENTLY IF EXISTS prefixes_prefix_idx;
@@ -0,0 +1,10 @@
+-- The running total of commands ran, so that it never has to be aggregated from the usage tables. Every flush of
+-- command_usage adds its count here, which lets old command_usage rows be deleted without changing the total.
+CREATE TABLE IF NOT EXISTS command_totals(
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    count BIGINT NOT NULL
+);
+
+INSERT INTO command_totals (count)
+    SELECT (SELECT COALESCE(SUM(count), 0) FROM command_statistics) + (SELECT COALESCE(SUM(count), 0) FROM command_usage)
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,62 @@
+"""Measures how long each extension takes to import, and how much memory importing it adds.
+
+Every extension is imported in a fresh interpreter run with `-X importtime`, after the bot and the libraries every cog
+shares have been imported, so only what the extension itself pulls in is counted. The time is the cumulative import
+time of the extension's module, and the memory is how much the peak RSS grew while importing it. Each extension is
+imported `runs` times, and the best run is reported.
+
+Run from the repository root, with the bot's environment variables set (RSS is only available on Unix):
+
+    python -m scripts.bench_extension_imports [runs] [extension ...]
+"""
+
+from __future__ import annotations
+
+import runpy
+import subprocess
+import sys
+
+# Imported before the extension, since they're loaded by the bot itself
+PRELOAD = "import discord, discord.ext.commands, aiohttp, asyncpg, bot"
+
+# `importlib.import_module` isn't reported by `-X importtime`, unlike the import statement and `__import__`
+CHILD = f"""
+import resource, sys
+{PRELOAD}
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+__import__(sys.argv[1])
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before)
+"""
+
+
+def measure(extension: str) -> tuple[float, float]:
+    """Returns the cumulative import time, in milliseconds, and the peak RSS growth, in megabytes, of an extension."""
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, extension], capture_output=True, text=True, check=True
+    )
+
+    cumulative = 0
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if line.startswith("import time:") and line.rsplit("|", 1)[-1].strip() == extension:
+            cumulative = int(line.split("|")[1])
+
+    return cumulative / 1000, int(result.stdout) / 1024  # ru_maxrss is in kilobytes on Linux
+
+
+def main(runs: int, extensions: list[str]) -> None:
+    print(f"{'extension':<22} {'import':>10} {'rss':>10}")  # noqa: T201
+
+    for extension in extensions:
+        results = [measure(extension) for _ in range(runs)]
+        import_time = min(time for time, _ in results)
+        rss = min(rss for _, rss in results)
+
+        print(f"{extension:<22} {import_time:8.1f}ms {rss:8.1f}MB")  # noqa: T201
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    extensions = sys.argv[2:] or runpy.run_path("__main__.py")["initial_extensions"]
+    main(runs, extensions)
@@ -0,0 +1,90 @@
+"""Measures the cost of finding inline search queries, with the old regex scrub and with the single-pass tokenizer.
+
+The old scrub removed inline code, code blocks and hyperlinks one pattern at a time, rebuilding the message for every
+inline code span, then searched what was left for `{{anime}}` and `[[manga]]` queries. The tokenizer scans the message
+once. Both are measured on realistic messages and on adversarial ones full of unclosed delimiters, at Discord's message
+length limits (2000 characters, and 4000 with Nitro).
+
+Run from the repository root, with the bot's environment variables set:
+
+    python -m scripts.bench_inline_tokenizer [seconds]
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+import time
+from typing import Callable
+
+from cogs.anime.inline import InlineQueries, find_inline_queries
+
+# The patterns the scrub used, formerly in `cogs.anime.types.Regex`
+ANIME_REGEX = re.compile(r"\{\{(.*?)\}\}")
+MANGA_REGEX = re.compile(r"\[\[(.*?)\]\]")
+INLINE_CB_REGEX = re.compile(r"(?P<CB>(`{1,2})[^`^\n]+?\2)(?:$|[^`])")
+CB_REGEX = re.compile(r"```[\S\s]+?```")
+HL_REGEX = re.compile(r"\[.*?\]\(.*?\)")
+
+
+def find_inline_queries_scrub(content: str) -> InlineQueries:
+    """The inline search listener's parsing, before the tokenizer."""
+
+    for match in reversed(list(INLINE_CB_REGEX.finditer(content))):
+        start, end = match.span("CB")
+        content = content[:start] + content[end:]
+
+    content = CB_REGEX.sub(" ", content)
+    content = HL_REGEX.sub(" ", content)
+
+    return InlineQueries(ANIME_REGEX.findall(content), MANGA_REGEX.findall(content))
+
+
+def fill(pattern: str, length: int) -> str:
+    return (pattern * (length // len(pattern) + 1))[:length]
+
+
+REALISTIC = (
+    "has anyone watched {{Frieren}} yet? the `ep 10` fight was great, and [[Berserk]] is next on my list.\n"
+    "clips here: [this one](https://example.com/clip?id=1) and `[[not a query]]`\n"
+    "```py\nprint('{{also not a query}}')\n```\n"
+    "just chatting about something else for a while, nothing to see here, mostly plain text. "
+)
+
+# Repeated up to each message length
+MESSAGES: dict[str, str] = {
+    "plain": "just chatting about something, nothing to see here. ",
+    "realistic": REALISTIC,
+    "unclosed {{": "{{",
+    "unclosed [[": "[[a]",
+    "unclosed hyperlinks": "[a](",
+    "unclosed inline code": "`a",
+}
+
+
+def measure(func: Callable[[str], InlineQueries], content: str, budget: float) -> float:
+    """Returns the time per call, in microseconds, running for about `budget` seconds."""
+
+    calls = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < budget:
+        func(content)
+        calls += 1
+
+    return elapsed / calls * 1_000_000
+
+
+def main(budget: float) -> None:
+    print(f"{'message':<22} {'length':>6} {'scrub':>12} {'tokenizer':>12} {'speedup':>8}")  # noqa: T201
+
+    for name, pattern in MESSAGES.items():
+        for length in (2000, 4000):
+            message = fill(pattern, length)
+            old = measure(find_inline_queries_scrub, message, budget)
+            new = measure(find_inline_queries, message, budget)
+
+            print(f"{name:<22} {length:>6} {old:10.1f}us {new:10.1f}us {old / new:7.1f}x")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 0.5)
@@ -0,0 +1,117 @@
+"""Measures the CPU cost of dispatching a message, with the old listeners and with the message pipeline.
+
+The old dispatch ran `Bot.on_message` (which builds a context to process commands) alongside an `on_message` listener
+per cog, two of which built a context of their own. The pipeline builds one context and hands it to every handler.
+The handlers do nothing here, so only the cost of the dispatch itself is measured.
+
+Run from the repository root, with the bot's environment variables set:
+
+    python -m scripts.bench_message_pipeline [messages]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from types import MethodType, SimpleNamespace
+from typing import Any
+
+import discord
+from discord.ext import commands
+
+from bot import Harmony
+from utils import BaseCog, Context, message_handler
+
+
+class Handlers(BaseCog):
+    """The cogs' message handlers, without their bodies."""
+
+    @message_handler()
+    async def inline_search_listener(self, ctx: Context) -> None: ...
+
+    @message_handler()
+    async def afk_listener(self, ctx: Context) -> None: ...
+
+    @message_handler()
+    async def prefix_listener(self, ctx: Context) -> None: ...
+
+    @message_handler(bots=True, blacklisted=True)
+    async def message_listener(self, ctx: Context) -> None: ...
+
+
+def add_legacy_listeners(bot: Harmony) -> None:
+    """Registers the cogs' listeners as they were before the pipeline, also without their bodies."""
+
+    async def inline_search_listener(message: discord.Message) -> None:
+        ctx = await bot.get_context(message)
+        if ctx.is_blacklisted() or message.author.bot:
+            return
+
+    async def afk_listener(message: discord.Message) -> None:
+        ctx = await bot.get_context(message)
+        if ctx.command or ctx.is_blacklisted() or message.author.bot:
+            return
+
+    async def prefix_listener(_: discord.Message) -> None:
+        return
+
+    async def message_listener(message: discord.Message) -> None:
+        if message.guild is None or message.webhook_id is not None:
+            return
+
+    for listener in (inline_search_listener, afk_listener, prefix_listener, message_listener):
+        bot.add_listener(listener, "on_message")
+
+    bot.on_message = MethodType(commands.Bot.on_message, bot)  # type: ignore
+
+
+def make_message(bot: Harmony, content: str) -> Any:
+    author = SimpleNamespace(id=1, bot=False)
+    guild = SimpleNamespace(id=2)
+    channel = SimpleNamespace(id=3, guild=guild)
+    return SimpleNamespace(
+        id=4, content=content, author=author, guild=guild, channel=channel, webhook_id=None, _state=bot._connection
+    )
+
+
+async def measure(bot: Harmony, messages: int) -> float:
+    """Returns the CPU time per message, in microseconds."""
+
+    message = make_message(bot, "just chatting about something, nothing to see here")
+
+    start = time.process_time()
+    for _ in range(messages):
+        bot.dispatch("message", message)
+        await asyncio.sleep(0)  # Runs `on_message` and the listeners
+
+        while len(asyncio.all_tasks()) > 1:
+            await asyncio.sleep(0)
+
+    return (time.process_time() - start) / messages * 1_000_000
+
+
+async def main(messages: int) -> None:
+    results: dict[str, float] = {}
+    for name in ("listeners", "pipeline"):
+        bot = Harmony(discord.Intents.default(), [])
+        await bot._async_setup_hook()  # Binds the bot to the running loop, as `async with bot` would
+        bot.blacklist = {}
+        bot.guild_blacklist = {}
+
+        if name == "listeners":
+            add_legacy_listeners(bot)
+        else:
+            bot.message_handlers.extend(Handlers(bot).get_message_handlers())
+
+        await measure(bot, messages // 10)  # Warm-up
+        results[name] = await measure(bot, messages)
+
+    for name, cost in results.items():
+        print(f"{name:<10} {cost:7.1f}us per message")  # noqa: T201
+
+    print(f"pipeline is {results['listeners'] / results['pipeline']:.2f}x cheaper")  # noqa: T201
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000))
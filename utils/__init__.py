@@ -7,11 +7,18 @@ from discord import Embed
 from .banned_member import *
 from .cog import *
 from .context import *
+from .database import *
 from .embed import *
 from .exceptions import *
+from .metrics import *
+from .migrations import *
+from .offload import *
 from .paginator import *
+from .prefix import *
+from .tracing import *
 from .utils import *
 from .view import *
+from .watchdog import *
 
 if TYPE_CHECKING:
     PrimaryEmbed = Embed
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, NamedTuple, TypeVar
 
 from discord.ext import commands
 
@@ -9,12 +9,38 @@ if TYPE_CHECKING:
 
     from . import Context
 
-__all__ = ("BaseCog", "BaseCogMeta")
+__all__ = ("BaseCog", "BaseCogMeta", "MessageHandler", "message_handler")
+
+
+FuncT = TypeVar("FuncT", bound=Callable[..., Coroutine[Any, Any, Any]])
+
+
+class MessageHandler(NamedTuple):
+    """A handler registered in the bot's message pipeline."""
+
+    callback: Callable[[Context], Coroutine[Any, Any, Any]]
+    bots: bool
+    blacklisted: bool
+
+
+def message_handler(*, bots: bool = False, blacklisted: bool = False) -> Callable[[FuncT], FuncT]:
+    """Marks a cog method as a handler in the bot's message pipeline.
+
+    Handlers receive the message's shared `Context` instead of the raw message.
+    Messages from bots and blacklisted users are only passed on if `bots` and `blacklisted` are set respectively.
+    """
+
+    def decorator(func: FuncT) -> FuncT:
+        func.__message_handler__ = (bots, blacklisted)  # type: ignore
+        return func
+
+    return decorator
 
 
 class BaseCogMeta(commands.CogMeta):
     hidden: bool
     owner_only: bool
+    __message_handlers__: list[str]
 
     def __new__(cls, *args: Any, **kwargs: Any) -> BaseCogMeta:  # noqa: PYI034
         hidden = kwargs.pop("hidden", False)
@@ -28,6 +54,14 @@ class BaseCogMeta(commands.CogMeta):
         inst.hidden = hidden
         inst.owner_only = owner_only
 
+        handlers: dict[str, None] = {}
+        for base in reversed(inst.__mro__):
+            for name, value in base.__dict__.items():
+                if hasattr(value, "__message_handler__"):
+                    handlers[name] = None
+
+        inst.__message_handlers__ = list(handlers)
+
         return inst
 
 
@@ -51,3 +85,13 @@ class BaseCog(commands.Cog, metaclass=BaseCogMeta):
     def is_hidden(self) -> bool:
         """Returns `True` if the cog is hidden."""
         return self.hidden or all(cmd.hidden for cmd in self.get_commands())
+
+    def get_message_handlers(self) -> list[MessageHandler]:
+        """Returns the cog's message pipeline handlers."""
+        handlers: list[MessageHandler] = []
+        for name in self.__message_handlers__:
+            callback = getattr(self, name)
+            bots, blacklisted = callback.__message_handler__
+            handlers.append(MessageHandler(callback, bots, blacklisted))
+
+        return handlers
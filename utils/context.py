@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import time
 from typing import TYPE_CHECKING, Any, Optional, cast, overload
 
 from discord.ext import commands
@@ -13,6 +14,8 @@ if TYPE_CHECKING:
 
     from bot import Harmony  # noqa: F401
 
+    from .tracing import Span
+
     Command = commands.Command[Any, Any, Any]
 
 
@@ -25,6 +28,13 @@ class Context(commands.Context["Harmony"]):
     guild: discord.Guild
     command: Command
 
+    _blacklisted: Optional[bool] = None
+    trace: Optional[Span] = None
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.started_at = time.perf_counter()
+
     @property
     def clean_prefix(self) -> str:
         clean = super().clean_prefix
@@ -48,9 +58,19 @@ class Context(commands.Context["Harmony"]):
 
         return self.bot.pool
 
+    async def send(self, *args: Any, **kwargs: Any) -> discord.Message:
+        with self.bot.tracer.span("send", "discord"):
+            return await super().send(*args, **kwargs)
+
     def is_blacklisted(self) -> bool:
-        """Checks if the guild or author is blacklisted."""
+        """Checks if the guild or author is blacklisted. The verdict is computed once per context."""
+
+        if self._blacklisted is None:
+            self._blacklisted = self._check_blacklist()
+
+        return self._blacklisted
 
+    def _check_blacklist(self) -> bool:
         blacklist = self.bot.blacklist
 
         guild = cast("Optional[discord.Guild]", self.guild)
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, AsyncIterator, Iterable, Literal, NamedTuple, Optional
+
+from .offload import TaskMetrics
+
+if TYPE_CHECKING:
+    from asyncpg import Pool, Record
+    from asyncpg.pool import PoolConnectionProxy
+
+__all__ = ("Database", "Lane", "Query", "query", "QUERIES", "current_lane")
+
+QUERIES: dict[str, Query] = {}
+
+LaneName = Literal["interactive", "background"]
+
+# Work is in the background lane unless it's part of a command invocation
+current_lane: ContextVar[LaneName] = ContextVar("current_lane", default="background")
+
+
+class Query(NamedTuple):
+    """A named SQL statement; its name is what the statement's timings are recorded under."""
+
+    name: str
+    sql: str
+
+
+def query(name: str, sql: str) -> Query:
+    """Declares a named query. Declaring a name again replaces the query, e.g. when an extension is reloaded."""
+
+    QUERIES[name] = declared = Query(name, sql)
+    return declared
+
+
+class Lane:
+    """A share of the pool's connections; at most `limit` of them can be held through the lane at once."""
+
+    __slots__ = ("active", "limit", "name", "semaphore", "waiting")
+
+    def __init__(self, name: LaneName, limit: int) -> None:
+        self.name = name
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+
+        self.waiting = 0
+        self.active = 0
+
+
+class Database:
+    """Runs named queries on the pool, recording how long each one waited for a connection and took to run.
+
+    The statements are prepared once per connection, by asyncpg's statement cache, since every call of a named query uses
+    the exact same SQL.
+
+    Connections are handed out through two lanes. Commands use the interactive lane, which can use the whole pool, while
+    everything else (message listeners, batched writes) uses the background lane, which leaves `reserved` connections
+    free so that a burst of messages can't make commands wait for a connection.
+    """
+
+    def __init__(self, pool: Pool[Record], *, reserved: int = 3) -> None:
+        self.pool = pool
+
+        size = pool.get_max_size()
+        self.lanes: dict[LaneName, Lane] = {
+            "interactive": Lane("interactive", size),
+            "background": Lane("background", max(size - reserved, 1)),
+        }
+
+        self.timings: dict[str, TaskMetrics] = {}
+        self.waits: dict[str, TaskMetrics] = {}
+
+    @asynccontextmanager
+    async def acquire(self, lane: Optional[LaneName] = None) -> AsyncIterator[PoolConnectionProxy[Record]]:
+        """Acquires a connection through a lane, the current one by default."""
+
+        selected = self.lanes[lane or current_lane.get()]
+        selected.waiting += 1
+        waiting = True
+
+        try:
+            async with selected.semaphore, self.pool.acquire() as conn:
+                selected.waiting -= 1
+                waiting = False
+
+                selected.active += 1
+                try:
+                    yield conn
+                finally:
+                    selected.active -= 1
+
+        finally:
+            if waiting:
+                selected.waiting -= 1
+
+    async def _run(self, query: Query, method: str, *args: Any) -> Any:
+        timings = self.timings.setdefault(query.name, TaskMetrics())
+        waits = self.waits.setdefault(query.name, TaskMetrics())
+
+        start = time.perf_counter()
+        async with self.acquire() as conn:
+            acquired = time.perf_counter()
+            waits.record(acquired - start, error=False)
+
+            error = False
+            try:
+                return await getattr(conn, method)(query.sql, *args)
+
+            except Exception:
+                error = True
+                raise
+
+            finally:
+                timings.record(time.perf_counter() - acquired, error=error)
+
+    async def execute(self, query: Query, *args: Any) -> str:
+        return await self._run(query, "execute", *args)
+
+    async def executemany(self, query: Query, args: Iterable[Iterable[Any]]) -> None:
+        await self._run(query, "executemany", args)
+
+    async def fetch(self, query: Query, *args: Any) -> list[Record]:
+        return await self._run(query, "fetch", *args)
+
+    async def fetchrow(self, query: Query, *args: Any) -> Optional[Record]:
+        return await self._run(query, "fetchrow", *args)
+
+    async def fetchval(self, query: Query, *args: Any) -> Any:
+        return await self._run(query, "fetchval", *args)
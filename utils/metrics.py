@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Iterable, Optional, Protocol
+
+from aiohttp import TraceConfig, web
+
+from .offload import TaskMetrics
+
+if TYPE_CHECKING:
+    from types import SimpleNamespace
+
+    from aiohttp import ClientSession, TraceRequestEndParams, TraceRequestExceptionParams
+
+    from bot import Harmony
+
+__all__ = ("MetricsServer",)
+
+log = logging.getLogger("Harmony.metrics")
+
+
+class CacheStatistics(Protocol):
+    hits: int
+    misses: int
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Writer:
+    """Builds a response in the Prometheus text format."""
+
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+
+    def metric(self, name: str, type: str, samples: Iterable[tuple[dict[str, Any], float]]) -> None:
+        self.lines.append(f"# TYPE harmony_{name} {type}")
+        for labels, value in samples:
+            if labels:
+                formatted = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+                self.lines.append(f"harmony_{name}{{{formatted}}} {value}")
+            else:
+                self.lines.append(f"harmony_{name} {value}")
+
+    def gauge(self, name: str, value: float) -> None:
+        self.metric(name, "gauge", [({}, value)])
+
+    def timings(self, name: str, label: str, metrics: dict[str, TaskMetrics]) -> None:
+        items = sorted(metrics.items())
+        self.metric(f"{name}_total", "counter", (({label: key}, m.count) for key, m in items))
+        self.metric(f"{name}_errors_total", "counter", (({label: key}, m.errors) for key, m in items))
+        self.metric(f"{name}_seconds_sum", "counter", (({label: key}, round(m.total, 6)) for key, m in items))
+        self.metric(f"{name}_seconds_max", "gauge", (({label: key}, round(m.max, 6)) for key, m in items))
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+class MetricsServer:
+    """Serves runtime metrics in the Prometheus text format on `/metrics`, and a readiness probe on `/ready`.
+
+    Most values are read from the bot when the endpoint is scraped; the timings of events, commands and outgoing HTTP
+    requests are recorded as they happen.
+    """
+
+    def __init__(self, bot: Harmony) -> None:
+        self.bot = bot
+
+        self.events: dict[str, TaskMetrics] = {}
+        self.commands: dict[str, TaskMetrics] = {}
+        self.http_responses: Counter[tuple[str, str]] = Counter()  # (host, status)
+        self.caches: dict[str, CacheStatistics] = {}
+
+        self.runner: Optional[web.AppRunner] = None
+
+    def observe_event(self, event: str, elapsed: float, *, error: bool = False) -> None:
+        self.events.setdefault(event, TaskMetrics()).record(elapsed, error=error)
+
+    def observe_command(self, command: str, elapsed: float, *, error: bool = False) -> None:
+        self.commands.setdefault(command, TaskMetrics()).record(elapsed, error=error)
+
+    def add_cache(self, name: str, cache: CacheStatistics) -> None:
+        """Registers something with `hits` and `misses` counters, exposed as a cache."""
+
+        self.caches[name] = cache
+
+    def trace_config(self) -> TraceConfig:
+        """Returns a trace config which counts the responses of a `ClientSession`, by host and status."""
+
+        async def on_request_end(_: ClientSession, __: SimpleNamespace, params: TraceRequestEndParams) -> None:
+            self.http_responses[(params.url.host or "", str(params.response.status))] += 1
+
+        async def on_request_exception(_: ClientSession, __: SimpleNamespace, params: TraceRequestExceptionParams) -> None:
+            self.http_responses[(params.url.host or "", "error")] += 1
+
+        config = TraceConfig()
+        config.on_request_end.append(on_request_end)
+        config.on_request_exception.append(on_request_exception)
+        return config
+
+    async def start(self, host: str, port: int) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        app.router.add_get("/ready", self.handle_ready)
+
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        log.info("Serving metrics on %s:%s", host, port)
+
+    async def close(self) -> None:
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    def is_ready(self) -> bool:
+        pool = getattr(self.bot, "pool", None)
+        return self.bot.is_ready() and not self.bot.is_closed() and pool is not None and not pool.is_closing()
+
+    async def handle_ready(self, _: web.Request) -> web.Response:
+        if self.is_ready():
+            return web.Response(text="ready\n")
+
+        return web.Response(text="not ready\n", status=503)
+
+    async def handle_metrics(self, _: web.Request) -> web.Response:
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+    def render(self) -> str:
+        from psutil import Process
+
+        bot = self.bot
+        writer = _Writer()
+        cluster = {"cluster": bot.cluster_id}
+
+        writer.metric("ready", "gauge", [(cluster, int(self.is_ready()))])
+        writer.gauge("uptime_seconds", round(time.perf_counter() - bot.boot_started, 3))
+        writer.gauge("guilds", len(bot.guilds))
+        writer.metric(
+            "gateway_latency_seconds",
+            "gauge",
+            (({"shard": shard_id}, round(latency, 6)) for shard_id, latency in bot.latencies if latency == latency),
+        )
+
+        monitor = bot.loop_monitor
+        writer.gauge("event_loop_lag_seconds", round(monitor.lag, 6))
+        writer.gauge("event_loop_lag_max_seconds", round(monitor.lag_max, 6))
+        writer.metric("event_loop_stalls_total", "counter", [({}, monitor.stall_count)])
+        writer.gauge("event_loop_tasks", len(asyncio.all_tasks()))
+
+        writer.timings("events", "event", self.events)
+        writer.timings("commands", "command", self.commands)
+        writer.timings("offload_tasks", "task", bot.offload.metrics)
+        writer.metric(
+            "offload_rejected_total", "counter", (({"task": name}, m.rejected) for name, m in bot.offload.metrics.items())
+        )
+
+        if (pool := getattr(bot, "pool", None)) is not None:
+            size, idle = pool.get_size(), pool.get_idle_size()
+            writer.metric("pool_connections", "gauge", [({"state": "busy"}, size - idle), ({"state": "idle"}, idle)])
+            writer.gauge("pool_max_connections", pool.get_max_size())
+
+        if (db := getattr(bot, "db", None)) is not None:
+            lanes = db.lanes.values()
+            writer.metric("db_lane_waiting", "gauge", (({"lane": lane.name}, lane.waiting) for lane in lanes))
+            writer.metric("db_lane_active", "gauge", (({"lane": lane.name}, lane.active) for lane in lanes))
+            writer.metric("db_lane_limit", "gauge", (({"lane": lane.name}, lane.limit) for lane in lanes))
+            writer.timings("queries", "query", db.timings)
+
+            waits = sorted(db.waits.items())
+            writer.metric("query_acquire_seconds_sum", "counter", (({"query": n}, round(m.total, 6)) for n, m in waits))
+            writer.metric("query_acquire_seconds_max", "gauge", (({"query": n}, round(m.max, 6)) for n, m in waits))
+
+        writer.metric(
+            "http_responses_total",
+            "counter",
+            (({"host": host, "status": status}, count) for (host, status), count in sorted(self.http_responses.items())),
+        )
+
+        caches = sorted(self.caches.items())
+        writer.metric("cache_hits_total", "counter", (({"cache": name}, c.hits) for name, c in caches))
+        writer.metric("cache_misses_total", "counter", (({"cache": name}, c.misses) for name, c in caches))
+
+        process = Process()
+        with process.oneshot():
+            cpu = process.cpu_times()
+            writer.gauge("process_resident_memory_bytes", process.memory_info().rss)
+            writer.metric("process_cpu_seconds_total", "counter", [({}, round(cpu.user + cpu.system, 3))])
+
+        return writer.render()
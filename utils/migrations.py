@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from asyncpg import Connection, Pool, Record
+
+__all__ = ("Migration", "load_migrations", "get_pending_migrations", "apply_migrations")
+
+log = logging.getLogger("Harmony.migrations")
+
+MIGRATIONS_PATH = Path("migrations")
+FILENAME_REGEX = re.compile(r"^(?P<version>\d{4})_(?P<name>\w+)\.sql$")
+LOCK_KEY = 0x4861726D  # "Harm"
+CONCURRENT_INDEX_REGEX = re.compile(
+    r"^CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(?P<name>\w+)", re.IGNORECASE
+)
+
+INVALID_INDEX_QUERY = "SELECT EXISTS(SELECT 1 FROM pg_index WHERE indexrelid = to_regclass($1) AND NOT indisvalid)"
+
+CREATE_TABLE_QUERY = """
+    CREATE TABLE IF NOT EXISTS schema_migrations(
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        checksum TEXT NOT NULL,
+        applied_at TIMESTAMPTZ DEFAULT current_timestamp
+    )
+"""
+
+
+class Migration(NamedTuple):
+    """A migration file, `NNNN_name.sql`.
+
+    Migrations are applied in a transaction, unless the file starts with `-- no-transaction`, which is needed for
+    statements such as `CREATE INDEX CONCURRENTLY`. Those are executed one statement at a time.
+
+    A concurrent index build which fails or is interrupted leaves an invalid index behind, which `IF NOT EXISTS` would
+    then skip; an invalid index with the name of one being created is dropped first, and the index is checked to be
+    valid once created.
+    """
+
+    version: int
+    name: str
+    sql: str
+    checksum: str
+
+    @property
+    def transactional(self) -> bool:
+        return not self.sql.startswith("-- no-transaction")
+
+    def statements(self) -> list[str]:
+        return [s.strip() for s in re.split(r";\s*$", self.sql, flags=re.MULTILINE) if s.strip()]
+
+
+def load_migrations(path: Path = MIGRATIONS_PATH) -> list[Migration]:
+    """Returns the migrations in a directory, ordered by version."""
+
+    migrations: list[Migration] = []
+    for file in path.iterdir():
+        if not (match := FILENAME_REGEX.match(file.name)):
+            continue
+
+        sql = file.read_text(encoding="utf-8")
+        checksum = hashlib.sha256(sql.encode()).hexdigest()
+        migrations.append(Migration(int(match["version"]), match["name"], sql, checksum))
+
+    migrations.sort(key=lambda m: m.version)
+    return migrations
+
+
+async def _get_applied(conn: Connection[Record] | Pool[Record]) -> dict[int, str]:
+    if await conn.fetchval("SELECT to_regclass('schema_migrations')") is None:
+        return {}
+
+    records = await conn.fetch("SELECT version, checksum FROM schema_migrations")
+    return {record["version"]: record["checksum"] for record in records}
+
+
+def _get_pending(migrations: list[Migration], applied: dict[int, str]) -> list[Migration]:
+    pending: list[Migration] = []
+    for migration in migrations:
+        checksum = applied.get(migration.version)
+        if checksum is None:
+            pending.append(migration)
+
+        elif checksum != migration.checksum:
+            log.warning("Migration %04d_%s was changed after being applied", migration.version, migration.name)
+
+    return pending
+
+
+async def _execute_concurrently(conn: Connection[Record], statement: str) -> None:
+    """Executes a statement of a non-transactional migration."""
+
+    # Comments before the statement are kept in the split statements
+    sql = "\n".join(line for line in statement.splitlines() if not line.lstrip().startswith("--")).strip()
+    if not (match := CONCURRENT_INDEX_REGEX.match(sql)):
+        await conn.execute(statement)
+        return
+
+    name = match["name"]
+    if await conn.fetchval(INVALID_INDEX_QUERY, name):
+        log.warning("Dropping invalid index %s, left behind by a failed build", name)
+        await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+    await conn.execute(statement)
+
+    if await conn.fetchval(INVALID_INDEX_QUERY, name):
+        raise RuntimeError(f"Index {name} is invalid after being created")
+
+
+async def get_pending_migrations(pool: Pool[Record], migrations: list[Migration]) -> list[Migration]:
+    """Returns the migrations that haven't been applied yet."""
+
+    return _get_pending(migrations, await _get_applied(pool))
+
+
+async def apply_migrations(pool: Pool[Record], migrations: list[Migration]) -> list[Migration]:
+    """Applies every pending migration, returning the ones that were applied.
+
+    When the schema is up to date this costs two reads and takes no locks. Otherwise the migrations are applied under an
+    advisory lock, so that processes starting at the same time don't apply them twice.
+    """
+
+    if not await get_pending_migrations(pool, migrations):
+        return []
+
+    async with pool.acquire() as conn:
+        await conn.execute("SELECT pg_advisory_lock($1)", LOCK_KEY)
+        try:
+            await conn.execute(CREATE_TABLE_QUERY)
+            pending = _get_pending(migrations, await _get_applied(conn))
+
+            for migration in pending:
+                log.info("Applying migration %04d_%s", migration.version, migration.name)
+                query = "INSERT INTO schema_migrations (version, name, checksum) VALUES ($1, $2, $3)"
+
+                if migration.transactional:
+                    async with conn.transaction():
+                        await conn.execute(migration.sql)
+                        await conn.execute(query, migration.version, migration.name, migration.checksum)
+
+                else:
+                    for statement in migration.statements():
+                        await _execute_concurrently(conn, statement)
+                    await conn.execute(query, migration.version, migration.name, migration.checksum)
+
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", LOCK_KEY)
+
+    return pending
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import TYPE_CHECKING, Any, Callable, Optional, TypeVar
+
+from .exceptions import GenericError
+
+if TYPE_CHECKING:
+    from cutlet import Cutlet
+
+__all__ = ("OffloadService", "TaskMetrics")
+
+log = logging.getLogger("Harmony.offload")
+
+T = TypeVar("T")
+
+
+# Worker process state and tasks, these run in the pool's processes
+
+_cutlet: Optional[Cutlet] = None
+
+
+def _initialize() -> None:
+    """Loads what the tasks need when a worker starts, so that only its first task pays for the Japanese dictionary."""
+
+    global _cutlet
+    from cutlet import Cutlet
+    from PIL import Image  # noqa: F401
+
+    _cutlet = Cutlet()
+
+
+def _ping() -> None: ...
+
+
+def _romaji(text: str) -> str:
+    assert _cutlet is not None
+    return _cutlet.romaji(text)
+
+
+def _image_colour(data: bytes) -> tuple[int, int, int]:
+    from PIL import Image
+
+    with Image.open(BytesIO(data)) as image:
+        pixels = image.load()
+        r, g, b, *_ = pixels[255, 0]  # type: ignore
+
+    return r, g, b
+
+
+class TaskMetrics:
+    """Timing metrics of one kind of offloaded task."""
+
+    __slots__ = ("count", "errors", "max", "rejected", "total")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.rejected = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def record(self, elapsed: float, *, error: bool) -> None:
+        self.count += 1
+        self.errors += error
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+
+
+class OffloadService:
+    """Runs CPU-heavy work in a pool of worker processes, so it can't stall the event loop.
+
+    Workers are started as tasks come in, and load what the tasks need when they start; `warm` starts them all ahead of
+    time instead, trading their memory for a fast first task.
+
+    At most `max_pending` tasks can be queued or running at once; anything past that is rejected immediately
+    with a `GenericError` rather than queueing up behind work that's already late.
+    """
+
+    def __init__(self, *, max_workers: int = 2, max_pending: int = 16) -> None:
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.metrics: dict[str, TaskMetrics] = {}
+
+    def start(self) -> None:
+        self.executor = ProcessPoolExecutor(
+            self.max_workers, mp_context=multiprocessing.get_context("spawn"), initializer=_initialize
+        )
+
+    async def warm(self) -> None:
+        """Starts every worker, running the initializer ahead of the first real task."""
+
+        assert self.executor is not None
+
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _ping) for _ in range(self.max_workers)))
+        log.info("Started %s offload workers in %.2fs", self.max_workers, time.perf_counter() - start)
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def restart(self, broken: ProcessPoolExecutor) -> None:
+        """Replaces a pool whose worker died, unless another task has already replaced it."""
+
+        if self.executor is broken:
+            log.warning("An offload worker died, restarting the pool")
+            self.close()
+            self.start()
+
+    async def run(self, name: str, func: Callable[..., T], *args: Any) -> T:
+        """Runs `func` in a worker process, recording its timing under `name`.
+
+        If a worker dies, which breaks the whole pool, the pool is restarted and `func` is retried once.
+        """
+
+        assert self.executor is not None
+
+        metrics = self.metrics.setdefault(name, TaskMetrics())
+        if self.pending >= self.max_pending:
+            metrics.rejected += 1
+            raise GenericError("I'm a bit too busy for that right now, try again in a moment.")
+
+        self.pending += 1
+        start = time.perf_counter()
+        error = False
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            try:
+                return await loop.run_in_executor(executor, func, *args)
+            except BrokenProcessPool:
+                self.restart(executor)
+                return await loop.run_in_executor(self.executor, func, *args)
+
+        except Exception:
+            error = True
+            raise
+
+        finally:
+            self.pending -= 1
+            metrics.record(time.perf_counter() - start, error=error)
+
+    async def romaji(self, text: str) -> str:
+        """Converts Japanese text to romaji."""
+
+        return await self.run("romaji", _romaji, text)
+
+    async def image_colour(self, data: bytes) -> tuple[int, int, int]:
+        """Returns the colour of the pixel at (255, 0) of an image."""
+
+        return await self.run("image_colour", _image_colour, data)
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable, Optional
+
+if TYPE_CHECKING:
+    from asyncpg import Pool, Record
+
+__all__ = ("PrefixEngine",)
+
+
+class PrefixEngine:
+    """Resolves command prefixes from memory.
+
+    Every guild's prefixes are kept as a tuple, mention prefixes included and ordered longest first, so the tuple can be
+    handed directly to `str.startswith` and the first prefix that matches is the longest one.
+    """
+
+    def __init__(self, default: str) -> None:
+        self.default = default
+
+        self.custom: dict[int, tuple[str, ...]] = {}
+        self.resolved: dict[int, tuple[str, ...]] = {}
+
+        self.mentions: tuple[str, ...] = ()
+        self.fallback: tuple[str, ...] = self._resolve((default,))
+
+    def _resolve(self, custom: Iterable[str]) -> tuple[str, ...]:
+        return tuple(sorted({*self.mentions, *custom}, key=len, reverse=True))
+
+    def set_user(self, user_id: int) -> None:
+        """Sets the bot's user ID, used for the mention prefixes."""
+
+        self.mentions = (f"<@{user_id}> ", f"<@!{user_id}> ")
+        self.fallback = self._resolve((self.default,))
+        self.resolved = {guild_id: self._resolve(prefixes) for guild_id, prefixes in self.custom.items()}
+
+    async def load(self, pool: Pool[Record]) -> None:
+        """Loads the prefixes of every guild."""
+
+        records = await pool.fetch("SELECT guild_id, prefixes FROM prefixes")
+        for record in records:
+            self.set(record["guild_id"], record["prefixes"])
+
+    def get(self, guild_id: Optional[int]) -> tuple[str, ...]:
+        """Returns every prefix of a guild, mention prefixes included."""
+
+        if guild_id is None:
+            return self.fallback
+
+        return self.resolved.get(guild_id, self.fallback)
+
+    def get_custom(self, guild_id: int) -> tuple[str, ...]:
+        """Returns the custom prefixes of a guild, in the order they were added."""
+
+        return self.custom.get(guild_id, (self.default,))
+
+    def set(self, guild_id: int, prefixes: Iterable[str]) -> None:
+        prefixes = tuple(prefixes)
+        self.custom[guild_id] = prefixes
+        self.resolved[guild_id] = self._resolve(prefixes)
+
+    def add(self, guild_id: int, prefix: str) -> None:
+        self.set(guild_id, (*self.get_custom(guild_id), prefix))
+
+    def remove(self, guild_id: int, prefix: str) -> None:
+        self.set(guild_id, (p for p in self.get_custom(guild_id) if p != prefix))
+
+    def reset(self, guild_id: int) -> None:
+        self.set(guild_id, (self.default,))
+
+    def discard(self, guild_id: int) -> None:
+        """Forgets a guild's prefixes."""
+
+        self.custom.pop(guild_id, None)
+        self.resolved.pop(guild_id, None)
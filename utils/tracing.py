@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+from aiohttp import TraceConfig
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from types import SimpleNamespace
+
+    from aiohttp import ClientSession, TraceRequestEndParams, TraceRequestExceptionParams, TraceRequestStartParams
+    from asyncpg import Connection, Record
+    from asyncpg.connection import LoggedQuery
+
+__all__ = ("Span", "Tracer")
+
+log = logging.getLogger("Harmony.tracing")
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed piece of work, such as a command invocation or one of the queries and requests it made."""
+
+    __slots__ = ("attributes", "children", "end", "kind", "name", "start")
+
+    def __init__(self, name: str, kind: str, *, start: Optional[float] = None, **attributes: Any) -> None:
+        self.name = name
+        self.kind = kind
+        self.start = time.perf_counter() if start is None else start
+        self.end: Optional[float] = None
+        self.attributes = {key: value for key, value in attributes.items() if value is not None}
+        self.children: list[Span] = []
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def to_dict(self, origin: Optional[float] = None) -> dict[str, Any]:
+        origin = self.start if origin is None else origin
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "offset_ms": round((self.start - origin) * 1000, 2),
+            "duration_ms": round(self.duration * 1000, 2),
+            **({"attributes": self.attributes} if self.attributes else {}),
+            **({"children": [child.to_dict(origin) for child in self.children]} if self.children else {}),
+        }
+
+    def format(self, origin: Optional[float] = None, depth: int = 0) -> Iterator[str]:
+        """Yields the span and its children as an indented tree, one line per span."""
+
+        origin = self.start if origin is None else origin
+        offset = (self.start - origin) * 1000
+        yield f"{'  ' * depth}{self.kind:<7} {self.name[:60]} +{offset:.0f}ms {self.duration * 1000:.1f}ms"
+
+        for child in self.children:
+            yield from child.format(origin, depth + 1)
+
+
+class Tracer:
+    """Traces command invocations.
+
+    A root span is opened per command and set as the current span of the task running it; queries, HTTP requests and
+    Discord messages sent from that task are added as child spans. Finished traces are appended to a JSONL file, and
+    the ones slower than `slow_threshold` seconds are also kept in memory.
+    """
+
+    def __init__(self, path: Optional[Path], *, slow_threshold: float = 1.0, max_slow: int = 50) -> None:
+        self.path = path
+        self.slow_threshold = slow_threshold
+        self.slow: deque[tuple[datetime, Span]] = deque(maxlen=max_slow)
+
+        self.buffer: list[str] = []
+        self.flush_task: Optional[asyncio.Task[None]] = None
+
+    def start_trace(self, name: str, *, start: Optional[float] = None, **attributes: Any) -> Span:
+        """Opens a root span and makes it the current span."""
+
+        span = Span(name, "command", start=start, **attributes)
+        current_span.set(span)
+        return span
+
+    def finish_trace(self, span: Span) -> None:
+        if span.end is not None:
+            return
+
+        span.end = time.perf_counter()
+        if self.path is not None:
+            self.buffer.append(json.dumps({"timestamp": datetime.now().isoformat(), **span.to_dict()}))
+
+        if span.duration >= self.slow_threshold:
+            self.slow.append((datetime.now(), span))
+
+    def record(self, name: str, kind: str, elapsed: float, **attributes: Any) -> None:
+        """Adds a finished child span to the current span."""
+
+        if (parent := current_span.get()) is not None and parent.end is None:
+            span = Span(name, kind, start=time.perf_counter() - elapsed, **attributes)
+            span.end = span.start + elapsed
+            parent.children.append(span)
+
+    @contextmanager
+    def span(self, name: str, kind: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Times the enclosed block as a child of the current span, if there is one."""
+
+        if (parent := current_span.get()) is None or parent.end is not None:
+            yield None
+            return
+
+        span = Span(name, kind, **attributes)
+        parent.children.append(span)
+        token = current_span.set(span)
+        try:
+            yield span
+        finally:
+            span.end = time.perf_counter()
+            current_span.reset(token)
+
+    def log_query(self, query: LoggedQuery) -> None:
+        # Query loggers are called with `call_soon`, which runs them in a copy of the querying task's context
+        error = query.exception and type(query.exception).__name__
+        self.record(" ".join(query.query.split()), "sql", query.elapsed, error=error)
+
+    async def setup_connection(self, conn: Connection[Record]) -> None:
+        """Adds the query logger to a connection, used as a pool's `init`."""
+
+        conn.add_query_logger(self.log_query)
+
+    def trace_config(self) -> TraceConfig:
+        """Returns a trace config which records the requests of a `ClientSession` as spans."""
+
+        async def on_request_start(_: ClientSession, ctx: SimpleNamespace, __: TraceRequestStartParams) -> None:
+            ctx.start = time.perf_counter()
+
+        async def on_request_end(_: ClientSession, ctx: SimpleNamespace, params: TraceRequestEndParams) -> None:
+            name = f"{params.method} {params.url.host}{params.url.path}"
+            self.record(name, "http", time.perf_counter() - ctx.start, status=params.response.status)
+
+        async def on_request_exception(_: ClientSession, ctx: SimpleNamespace, params: TraceRequestExceptionParams) -> None:
+            name = f"{params.method} {params.url.host}{params.url.path}"
+            self.record(name, "http", time.perf_counter() - ctx.start, error=type(params.exception).__name__)
+
+        config = TraceConfig()
+        config.on_request_start.append(on_request_start)
+        config.on_request_end.append(on_request_end)
+        config.on_request_exception.append(on_request_exception)
+        return config
+
+    def start(self) -> None:
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.flush_task = asyncio.create_task(self.flush_periodically())
+
+    async def close(self) -> None:
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            await self.flush()
+
+    async def flush_periodically(self, interval: float = 5.0) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self.buffer or self.path is None:
+            return
+
+        lines, self.buffer = self.buffer, []
+        try:
+            await asyncio.to_thread(self._write, self.path, lines)
+        except OSError as exc:
+            log.error("Failed to write %s traces", len(lines), exc_info=exc)
+
+    @staticmethod
+    def _write(path: Path, lines: list[str]) -> None:
+        with path.open("a", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
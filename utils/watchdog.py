@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Optional
+
+__all__ = ("LoopMonitor", "StallReport")
+
+log = logging.getLogger("Harmony.watchdog")
+
+
+class StallReport:
+    """A callback that held the event loop for longer than the monitor's threshold."""
+
+    __slots__ = ("duration", "stack", "started_at")
+
+    def __init__(self, started_at: datetime, duration: float, stack: str) -> None:
+        self.started_at = started_at
+        self.duration = duration
+        self.stack = stack
+
+
+class LoopMonitor:
+    """Measures the event loop's scheduling lag, and catches callbacks that block it.
+
+    A task on the loop beats every `interval` seconds while a watchdog thread checks on it. When the loop misses its beat
+    by more than `threshold` seconds, the thread records the stack the loop is stuck in, which is kept in a ring buffer
+    of the latest `max_reports` stalls.
+    """
+
+    def __init__(self, *, threshold: float = 0.25, interval: float = 0.1, max_reports: int = 50) -> None:
+        self.threshold = threshold
+        self.interval = interval
+
+        self.lag = 0.0
+        self.lag_max = 0.0
+        self.stall_count = 0
+        self.reports: deque[StallReport] = deque(maxlen=max_reports)
+
+        self.last_beat = time.monotonic()
+        self.loop_thread_id: Optional[int] = None
+        self.task: Optional[asyncio.Task[None]] = None
+        self.thread: Optional[threading.Thread] = None
+        self.stopped = threading.Event()
+
+    def start(self) -> None:
+        """Starts monitoring the running event loop."""
+
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.task = asyncio.create_task(self.beat())
+
+        self.thread = threading.Thread(target=self.watch, name="Harmony loop monitor", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.task is not None:
+            self.task.cancel()
+
+    async def beat(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+            self.last_beat = now = time.monotonic()
+            self.lag = max(now - start - self.interval, 0.0)
+            self.lag_max = max(self.lag_max, self.lag)
+
+    def watch(self) -> None:
+        current: Optional[StallReport] = None
+        current_beat = 0.0
+
+        while not self.stopped.wait(self.threshold / 2):
+            last_beat = self.last_beat
+            behind = time.monotonic() - last_beat - self.interval
+
+            if behind <= self.threshold:
+                current = None
+                continue
+
+            if current is not None and last_beat == current_beat:
+                current.duration = behind  # Still stuck in the same stall
+                continue
+
+            started_at = datetime.now() - timedelta(seconds=time.monotonic() - last_beat)
+            current, current_beat = StallReport(started_at, behind, self._loop_stack()), last_beat
+            self.reports.append(current)
+            self.stall_count += 1
+            log.warning("Event loop blocked for more than %.2fs:\n%s", self.threshold, current.stack)
+
+    def _loop_stack(self) -> str:
+        assert self.loop_thread_id is not None
+
+        frame = sys._current_frames().get(self.loop_thread_id)
+        return "".join(traceback.format_stack(frame)) if frame is not None else "(unknown)"